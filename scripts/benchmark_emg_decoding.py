@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Micro-benchmark of NeurOne SAMPLES frame decoding: compares the original
+# per-sample int24_to_int32 loop with the vectorized decode_samples path used
+# by the EMG driver.
+#
+# run with: python scripts/benchmark_emg_decoding.py [num_channels] [num_bundles]
+
+import struct
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from tms_dashboard.constants import FrameType, SAMPLES_HEADER_SIZE
+from tms_dashboard.core.modules.emg_connection import decode_samples, int24_to_int32
+
+
+def build_samples_frame(num_channels, num_bundles, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(-2**23, 2**23, size=(num_bundles, num_channels), dtype=np.int32)
+
+    header = struct.pack('>B3xIHHQ8x', FrameType.SAMPLES, 0, 0, num_bundles, 0)
+    payload = values.astype('>i4').view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
+    return header + payload, values
+
+
+def decode_loop(data, num_bundles, num_channels, scale_factor):
+    """Original decoding: one int24 slice per sample for every channel."""
+    out = []
+    bytes_per_bundle = num_channels * 3
+    for b in range(num_bundles):
+        for ch in range(num_channels):
+            pos = SAMPLES_HEADER_SIZE + (b * bytes_per_bundle) + ch * 3
+            out.append(int24_to_int32(data[pos:pos + 3]) * scale_factor)
+    return out
+
+
+def decode_vectorized(data, num_bundles, num_channels, scale_factor):
+    return decode_samples(data, num_bundles, num_channels) * scale_factor
+
+
+def main():
+    num_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    num_bundles = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    scale_factor = 0.1
+
+    data, expected = build_samples_frame(num_channels, num_bundles)
+    assert np.array_equal(decode_samples(data, num_bundles, num_channels), expected)
+    assert np.allclose(decode_loop(data, num_bundles, num_channels, scale_factor),
+                       (expected * scale_factor).ravel())
+
+    repeats = 200
+    t_loop = timeit.timeit(lambda: decode_loop(data, num_bundles, num_channels, scale_factor), number=repeats) / repeats
+    t_vec = timeit.timeit(lambda: decode_vectorized(data, num_bundles, num_channels, scale_factor), number=repeats) / repeats
+
+    n_samples = num_bundles * num_channels
+    print(f"Frame: {num_bundles} bundles x {num_channels} channels ({n_samples} samples)")
+    print(f"Per-sample loop: {t_loop * 1e6:10.1f} us/frame  ({n_samples / t_loop / 1e6:6.2f} Msamples/s)")
+    print(f"Vectorized:      {t_vec * 1e6:10.1f} us/frame  ({n_samples / t_vec / 1e6:6.2f} Msamples/s)")
+    print(f"Speedup:         {t_loop / t_vec:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
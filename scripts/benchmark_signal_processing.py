@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmark of MEP post-processing: the original per-window baseline/p2p
+# implementation (inlined below, one 1-D window per trial and channel, as the
+# former DashboardState pipeline ran it) against the batch
+# baseline_correct_batch/p2p_batch functions on the whole trial matrix.
+#
+# run with: python scripts/benchmark_signal_processing.py [num_channels]
+
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from tms_dashboard.utils.signal_processing import baseline_correct_batch, p2p_batch
+
+SAMPLING_RATE = 5000
+T_MIN_MS = -5
+T_MAX_MS = 40
+BASELINE_MS = (5, 20)
+
+
+def original_apply_baseline(baseline_start_ms, baseline_end_ms, signal_start_ms, signal_end_ms, data, sampling_rate):
+    # Per-window implementation replaced by baseline_correct_batch
+    total_samples = len(data)
+    baseline_start_idx = int((baseline_start_ms - signal_start_ms) * sampling_rate / 1000)
+    baseline_end_idx = int((baseline_end_ms - signal_start_ms) * sampling_rate / 1000)
+    baseline_start_idx = max(0, min(baseline_start_idx, total_samples - 1))
+    baseline_end_idx = max(0, min(baseline_end_idx, total_samples))
+    mean_baseline = np.mean(data[baseline_start_idx:baseline_end_idx])
+    return data - mean_baseline
+
+
+def original_p2p_from_time(signal, fs, tmin_ms, start_ms=10):
+    # Per-window implementation replaced by p2p_batch
+    signal = np.asarray(signal)
+    start_idx = int(round((start_ms - tmin_ms) * fs / 1000))
+    cropped = signal[start_idx:]
+    return round(np.ptp(cropped), 2)
+
+
+def process_loop(windows):
+    corrected, p2p = [], []
+    for window in windows:
+        channels = [original_apply_baseline(*BASELINE_MS, T_MIN_MS, T_MAX_MS, channel, SAMPLING_RATE)
+                    for channel in np.atleast_2d(window)]
+        corrected.append(channels)
+        p2p.append([original_p2p_from_time(channel, SAMPLING_RATE, T_MIN_MS) for channel in channels])
+    return corrected, p2p
+
+
+def process_batch(windows):
+    corrected, _ = baseline_correct_batch(windows, *BASELINE_MS, T_MIN_MS, SAMPLING_RATE)
+    return corrected, p2p_batch(corrected, SAMPLING_RATE, T_MIN_MS)
+
+
+def main():
+    num_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    num_samples = int((T_MAX_MS - T_MIN_MS) * SAMPLING_RATE / 1000)
+    rng = np.random.default_rng(0)
+
+    print(f"Windows: {num_channels} channel(s) x {num_samples} samples at {SAMPLING_RATE} Hz")
+    for num_trials in (20, 200, 2000):
+        windows = rng.normal(0, 50, size=(num_trials, num_channels, num_samples)).astype(np.float32)
+        if num_channels == 1:
+            windows = windows[:, 0]
+
+        _, p2p_loop = process_loop(windows)
+        _, result = process_batch(windows)
+        assert np.allclose(np.squeeze(p2p_loop), np.round(result.amplitude, 2), atol=0.011)
+
+        repeats = max(1, 2000 // num_trials)
+        t_loop = timeit.timeit(lambda: process_loop(windows), number=repeats) / repeats
+        t_batch = timeit.timeit(lambda: process_batch(windows), number=repeats) / repeats
+        print(f"{num_trials:5d} trials: loop {t_loop * 1e3:9.3f} ms | batch {t_batch * 1e3:8.3f} ms | "
+              f"speedup {t_loop / t_batch:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Runs the EMG driver (neuroOne) on its own and prints its statistics every
+# second: packet loss, captured windows and the p2p of the newest trials.
+# Use it together with scripts/neurone_simulator.py to measure parsing
+# headroom and packet-loss behaviour without the dashboard.
+#
+# run with: python scripts/emg_driver_monitor.py [neurone_host] [channel ...]
+# e.g.:     python scripts/emg_driver_monitor.py 127.0.0.1 33 34 35
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from tms_dashboard.constants import TriggerType
+from tms_dashboard.config import NEURONE_IP
+from tms_dashboard.core.modules.emg_connection import neuroOne
+from tms_dashboard.utils.signal_processing import baseline_correct_batch, p2p_batch
+
+
+def main():
+    host = sys.argv[1] if len(sys.argv) > 1 else NEURONE_IP
+    channels = [int(ch) for ch in sys.argv[2:]] or [33]
+
+    device = neuroOne(num_trial=20, t_min=-5, t_max=40, channels=channels,
+                      trigger_type_interest=TriggerType.STIMULUS, host=host)
+    device.start()
+
+    cursor = 0
+    try:
+        while True:
+            time.sleep(1)
+            stats = device.get_statistics()
+            line = (f"connected={device.get_connection()} measuring={device.get_status()} "
+                    f"lost={stats['packets_lost']} buffer={stats['buffer_size']} "
+                    f"windows={stats['captured_windows']} pending={stats['pending_triggers']} "
+                    f"batches={stats['receive_batches']} max_batch={stats['max_receive_batch']} "
+                    f"queue={stats['queue_depth']}/{stats['queue_high_water']} dropped={stats['queue_dropped']}")
+
+            batch = device.get_windows_since(cursor)
+            cursor = batch.cursor
+            if len(batch):
+                fs = device.get_sampling_rate()
+                t_min_ms = device.t_min * 1000
+                corrected, _ = baseline_correct_batch(batch.windows, t_min_ms, 0, t_min_ms, fs)
+                p2p = p2p_batch(corrected, fs, t_min_ms, start_ms=10).amplitude
+                line += f" | new p2p (uV): {np.round(p2p.astype(float), 1).tolist()}"
+            print(line)
+    except KeyboardInterrupt:
+        device.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This script simulates a Bittium NeurOne amplifier streaming over Real-time
+# Out (UDP). It waits for the JOIN packet on JOIN_PORT, then sends
+# MEASUREMENT_START, SAMPLES and TRIGGER frames with the byte layout parsed by
+# core/modules/emg_connection.py, so the EMG driver can be load-tested without
+# hardware.
+#
+# The signal is Gaussian noise plus a biphasic synthetic MEP after every
+# trigger. Packet loss can be injected to exercise the driver's loss counter.
+#
+# for the dashboard on the same machine: python scripts/neurone_simulator.py
+# (and create neuroOne with host='127.0.0.1')
+# stress test: python scripts/neurone_simulator.py --rate 20000 --channels 64 --bundles 20
+
+import argparse
+import socket
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from tms_dashboard.constants import FrameType, JOIN_PORT
+from tms_dashboard.config import NEURONE_PORT
+from tms_dashboard.core.modules.neurone_frames import (encode_int24, pack_measurement_start, pack_samples_header,
+                                                      pack_trigger, pack_measurement_end)
+
+SCALE_UV_PER_BIT = 0.1  # NeurOne AC channels (type byte 0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NeurOne Real-time Out UDP simulator")
+    parser.add_argument('--channels', type=int, default=64, help="Number of channels in each bundle")
+    parser.add_argument('--first-channel', type=int, default=1, help="Physical id of the first channel")
+    parser.add_argument('--rate', type=int, default=5000, help="Sampling rate in Hz")
+    parser.add_argument('--bundles', type=int, default=5, help="Sample bundles per SAMPLES packet")
+    parser.add_argument('--trigger-rate', type=float, default=0.5, help="Triggers per second (0 disables)")
+    parser.add_argument('--conditions', type=int, default=1, help="Trigger codes cycle through 1..conditions")
+    parser.add_argument('--noise', type=float, default=10.0, help="Noise standard deviation in uV")
+    parser.add_argument('--mep-amplitude', type=float, default=500.0, help="Mean MEP peak-to-peak in uV")
+    parser.add_argument('--mep-jitter', type=float, default=0.2, help="Relative MEP amplitude variability")
+    parser.add_argument('--mep-latency', type=float, default=20.0, help="MEP onset after the trigger in ms")
+    parser.add_argument('--mep-duration', type=float, default=10.0, help="MEP duration in ms")
+    parser.add_argument('--loss', type=float, default=0.0, help="Probability of dropping a SAMPLES packet")
+    parser.add_argument('--duration', type=float, default=0.0, help="Stop after this many seconds (0 runs forever)")
+    parser.add_argument('--target', default=None,
+                        help="Stream to this host immediately instead of waiting for a JOIN packet")
+    parser.add_argument('--port', type=int, default=NEURONE_PORT, help="Driver UDP port")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+class NeurOneSimulator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(args.seed)
+        self.channel_ids = list(range(args.first_channel, args.first_channel + args.channels))
+
+        # One second of noise, encoded once; packets are slices of this table
+        table_bundles = max(args.bundles, (args.rate // args.bundles) * args.bundles)
+        self.noise = np.round(self.rng.normal(0, args.noise / SCALE_UV_PER_BIT, size=(table_bundles, args.channels))).astype(np.int32)
+        self.noise_bytes = encode_int24(self.noise)
+        self.bundle_bytes = args.channels * 3
+
+        n_mep = max(1, int(args.mep_duration * args.rate / 1000))
+        phase = np.linspace(0, 2 * np.pi, n_mep)
+        self.mep_shape = np.sin(phase) * np.hanning(n_mep)
+        self.mep_shape /= np.ptp(self.mep_shape)
+        self.mep_delay = int(args.mep_latency * args.rate / 1000)
+
+        self.join_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.join_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.join_sock.bind(('', JOIN_PORT))
+        self.data_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.data_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8 * 1024 * 1024)
+
+    def wait_for_join(self):
+        print(f"Waiting for JOIN on UDP port {JOIN_PORT}...")
+        while True:
+            data, addr = self.join_sock.recvfrom(64)
+            if data and data[0] == FrameType.JOIN:
+                print(f"JOIN received from {addr[0]}")
+                return (addr[0], self.args.port)
+
+    def check_join(self):
+        """Non-blocking JOIN check: a restarted driver gets a new MEASUREMENT_START."""
+        try:
+            data, addr = self.join_sock.recvfrom(64)
+        except BlockingIOError:
+            return None
+        if data and data[0] == FrameType.JOIN:
+            return (addr[0], self.args.port)
+        return None
+
+    def packet_payload(self, sample_idx, active_meps):
+        args = self.args
+        pos = sample_idx % len(self.noise)
+        stop = sample_idx + args.bundles
+
+        overlapping = [(onset, amp) for onset, amp in active_meps
+                       if onset < stop and onset + len(self.mep_shape) > sample_idx]
+        if not overlapping:
+            return self.noise_bytes[pos * self.bundle_bytes:(pos + args.bundles) * self.bundle_bytes]
+
+        block = self.noise[pos:pos + args.bundles].astype(np.float64)
+        for onset, amp in overlapping:
+            lo = max(onset, sample_idx)
+            hi = min(onset + len(self.mep_shape), stop)
+            block[lo - sample_idx:hi - sample_idx] += (amp / SCALE_UV_PER_BIT) * self.mep_shape[lo - onset:hi - onset, None]
+        return encode_int24(np.round(block))
+
+    def run(self, target):
+        args = self.args
+        self.join_sock.setblocking(False)
+        self.data_sock.sendto(pack_measurement_start(args.rate, self.channel_ids), target)
+
+        trigger_interval = int(args.rate / args.trigger_rate) if args.trigger_rate > 0 else None
+        next_trigger = trigger_interval
+        trigger_count = 0
+        active_meps = []
+
+        total_samples = int(args.duration * args.rate) if args.duration > 0 else None
+        sample_idx = seq_no = 0
+        sent = dropped = 0
+        max_lag = 0.0
+
+        t0 = time.perf_counter()
+        report_time = t0 + 1.0
+        try:
+            while total_samples is None or sample_idx < total_samples:
+                due = t0 + sample_idx / args.rate
+                now = time.perf_counter()
+                if due > now:
+                    time.sleep(due - now)
+                else:
+                    max_lag = max(max_lag, now - due)
+
+                stop = sample_idx + args.bundles
+                payload = self.packet_payload(sample_idx, active_meps)
+                header = pack_samples_header(seq_no, args.channels, args.bundles, sample_idx)
+                if self.rng.random() >= args.loss:
+                    self.data_sock.sendto(header + payload, target)
+                    sent += 1
+                else:
+                    dropped += 1
+
+                if next_trigger is not None and next_trigger < stop:
+                    trigger_count += 1
+                    code = (trigger_count - 1) % args.conditions + 1
+                    self.data_sock.sendto(pack_trigger([(next_trigger, code)]), target)
+                    amplitude = args.mep_amplitude * max(0.0, 1 + args.mep_jitter * self.rng.standard_normal())
+                    active_meps.append((next_trigger + self.mep_delay, amplitude))
+                    next_trigger += trigger_interval
+                active_meps = [(onset, amp) for onset, amp in active_meps if onset + len(self.mep_shape) > stop]
+
+                sample_idx = stop
+                seq_no += 1
+
+                now = time.perf_counter()
+                if now >= report_time:
+                    elapsed = now - t0
+                    print(f"{elapsed:7.1f} s | {sent / elapsed:8.0f} packets/s | "
+                          f"{sample_idx * args.channels / elapsed / 1e6:6.2f} Msamples/s | "
+                          f"dropped {dropped} | triggers {trigger_count} | max lag {max_lag * 1e3:.1f} ms")
+                    max_lag = 0.0
+                    report_time = now + 1.0
+
+                    new_target = self.check_join()
+                    if new_target is not None:
+                        target = new_target
+                        self.data_sock.sendto(pack_measurement_start(args.rate, self.channel_ids), target)
+                        print(f"JOIN received from {target[0]}, measurement restarted")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.data_sock.sendto(pack_measurement_end(), target)
+            print(f"Sent {sent} SAMPLES packets, dropped {dropped}, {trigger_count} triggers")
+
+
+def main():
+    args = parse_args()
+    simulator = NeurOneSimulator(args)
+    target = (args.target, args.port) if args.target else simulator.wait_for_join()
+    print(f"Streaming {args.channels} channels at {args.rate} Hz, {args.bundles} bundles/packet to {target[0]}:{target[1]}")
+    simulator.run(target)
+
+
+if __name__ == '__main__':
+    main()
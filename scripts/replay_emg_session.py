@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Replays an EMG session recorded by EMGRecorder (NEURONE_RECORD_ENABLED)
+# through the real driver path: the samples are re-encoded as NeurOne
+# MEASUREMENT_START / SAMPLES / TRIGGER frames and parsed by neuroOne, and the
+# captured windows go through DashboardState exactly as in the dashboard.
+# Prints the p2p of every trial and the processing rate (parse rate in memory,
+# end-to-end rate with --udp), so changes to emg_connection.py or
+# signal_processing.py can be checked against real data.
+#
+# in memory, as fast as possible: python scripts/replay_emg_session.py data/emg_recordings/emg_<...>.json
+# real time over UDP (localhost):  python scripts/replay_emg_session.py <recording> --udp --speed 1
+# compare two versions:            ... --output before.csv, then diff the CSV files
+
+import argparse
+import csv
+import socket
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from tms_dashboard.constants import TriggerType
+from tms_dashboard.config import NEURONE_PORT
+from tms_dashboard.core.dashboard_state import DashboardState
+from tms_dashboard.core.modules.emg_connection import neuroOne, channel_scale_factor
+from tms_dashboard.core.modules.emg_recorder import EMGRecording
+from tms_dashboard.core.modules.neurone_frames import (encode_int24, pack_measurement_start, pack_samples_header,
+                                                      pack_trigger, pack_measurement_end)
+
+CHANNEL_TYPE_BYTES = (0, 1, 8, 9)  # NeurOne AC/DC, Tesla AC/DC
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a recorded NeurOne session through the EMG driver")
+    parser.add_argument('recording', help="Any file of the recording (.json, .f32 or _triggers.csv)")
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="Replay speed relative to real time (0 = as fast as possible)")
+    parser.add_argument('--udp', action='store_true',
+                        help="Send frames over UDP to a local driver instead of feeding it in memory")
+    parser.add_argument('--port', type=int, default=NEURONE_PORT, help="Driver UDP port in --udp mode")
+    parser.add_argument('--bundles', type=int, default=5, help="Sample bundles per SAMPLES packet")
+    parser.add_argument('--chunk', type=float, default=0.1, help="Seconds of frames encoded and sent at once")
+    parser.add_argument('--t-min', type=float, default=-5, help="Window start in ms")
+    parser.add_argument('--t-max', type=float, default=40, help="Window end in ms")
+    parser.add_argument('--num-trial', type=int, default=20)
+    parser.add_argument('--output', default=None, help="Write trial id, sample, code and p2p per channel to a CSV file")
+    parser.add_argument('--metrics', default=None,
+                        help="Write onset/peak latency and area of every trial and channel to a CSV file")
+    parser.add_argument('--quiet', action='store_true', help="Do not print the p2p of each trial")
+    return parser.parse_args()
+
+
+def channel_type_byte(scale):
+    """Type byte whose scale factor matches a recorded channel, so the raw integers round-trip."""
+    for type_byte in CHANNEL_TYPE_BYTES:
+        if np.isclose(channel_scale_factor(type_byte), scale):
+            return type_byte
+    raise ValueError(f"No NeurOne channel type has a scale of {scale} uV/bit")
+
+
+def iter_frames(recording, bundles, chunk_seconds):
+    """Yields (first sample of the chunk, frames) covering the recording chunk by chunk."""
+    scale = np.asarray(recording.header['scale_factors'], dtype=np.float64)
+    triggers = recording.triggers
+    valid_modes = {t.value for t in TriggerType}
+    num_channels = len(recording.channels)
+    bundle_bytes = num_channels * 3
+
+    chunk = max(bundles, int(chunk_seconds * recording.sampling_rate) // bundles * bundles)
+    seq_no = 0
+    for start in range(0, len(recording), chunk):
+        raw = np.round(recording.samples[start:start + chunk] / scale).astype(np.int32)
+        payload = encode_int24(raw)
+        first_idx = recording.first_sample_idx + start
+
+        chunk_triggers = triggers[(triggers['sample_idx'] >= first_idx) & (triggers['sample_idx'] < first_idx + len(raw))]
+        next_trigger = 0
+
+        frames = []
+        for pos in range(0, len(raw), bundles):
+            n = min(bundles, len(raw) - pos)
+            sample_idx = first_idx + pos
+            frames.append(pack_samples_header(seq_no, num_channels, n, sample_idx) +
+                          payload[pos * bundle_bytes:(pos + n) * bundle_bytes])
+            seq_no += 1
+
+            # Triggers follow the packet holding their sample, as on the amplifier
+            in_packet = []
+            while next_trigger < len(chunk_triggers) and chunk_triggers['sample_idx'][next_trigger] < sample_idx + n:
+                trigger = chunk_triggers[next_trigger]
+                if trigger['mode'] in valid_modes:
+                    in_packet.append((int(trigger['sample_idx']), int(trigger['code']), TriggerType(int(trigger['mode']))))
+                next_trigger += 1
+            if in_packet:
+                frames.append(pack_trigger(in_packet))
+
+        yield first_idx, frames
+
+
+def main():
+    args = parse_args()
+    recording = EMGRecording(args.recording)
+    fs = recording.sampling_rate
+    num_channels = len(recording.channels)
+    duration = len(recording) / fs
+    print(f"{len(recording)} samples x {num_channels} channels at {fs} Hz ({duration:.1f} s), "
+          f"{len(recording.triggers)} triggers")
+
+    type_bytes = [channel_type_byte(scale) for scale in recording.header['scale_factors']]
+    start_frame = pack_measurement_start(fs, recording.channels, type_bytes)
+
+    device = neuroOne(num_trial=args.num_trial, t_min=args.t_min, t_max=args.t_max, channels=recording.channels,
+                      trigger_type_interest=TriggerType.STIMULUS, host='127.0.0.1', port=args.port)
+    batches = []
+    device.subscribe(batches.append)
+    dashboard = DashboardState()
+
+    sock = None
+    target = ('127.0.0.1', args.port)
+    if args.udp:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8 * 1024 * 1024)
+        device.start()
+        sock.sendto(start_frame, target)
+    else:
+        device.feed([start_frame])
+
+    rows = []
+
+    def collect():
+        while batches:
+            batch = batches.pop(0)
+            dashboard.mep_channels = device.get_channels()
+            dashboard.mep_scale_factors = device.get_scale_factors()
+            added = dashboard.update_mep_history(batch, device.t_min, device.t_max, fs)
+            # Trials rejected in 'drop' mode are not in the history, so rows follow the returned indexes
+            sample_indexes = dict(zip(batch.trial_ids.tolist(), batch.sample_indexes.tolist()))
+            for idx in added:
+                trial_id = int(dashboard.mep_trial_ids[idx])
+                p2p = dashboard.mep_p2p_history_baseline[idx]
+                row = [trial_id, sample_indexes[trial_id], int(dashboard.mep_trigger_codes[idx])] + np.round(p2p.astype(float), 2).tolist()
+                rows.append(row)
+                if not args.quiet:
+                    print(f"trial {row[0]:5d} | sample {row[1]:10d} | code {row[2]:3d} | p2p (uV): {row[3:]}")
+
+    processing_time = 0.0
+    sleep_time = 0.0  # Pacing and drain sleeps, left out of the UDP end-to-end rate
+    t0 = time.perf_counter()
+    for first_idx, frames in iter_frames(recording, args.bundles, args.chunk):
+        if args.speed > 0:
+            due = t0 + (first_idx - recording.first_sample_idx) / (fs * args.speed)
+            now = time.perf_counter()
+            if due > now:
+                time.sleep(due - now)
+                sleep_time += time.perf_counter() - now
+
+        t_start = time.perf_counter()
+        if sock is not None:
+            for frame in frames:
+                sock.sendto(frame, target)
+        else:
+            device.feed(frames)
+        processing_time += time.perf_counter() - t_start
+        collect()
+
+    if sock is not None:
+        time.sleep(0.5)  # Lets the driver drain the socket before the measurement ends
+        sock.sendto(pack_measurement_end(), target)
+        time.sleep(0.1)
+        sleep_time += 0.6
+        collect()
+    wall_time = time.perf_counter() - t0
+    stats = device.get_statistics()
+    channels = device.get_channels()  # Window channel order, read before the measurement ends
+    if sock is not None:
+        device.stop()
+    else:
+        device.feed([pack_measurement_end()])
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['trial_id', 'sample_idx', 'code'] + [f"p2p_ch{ch}" for ch in recording.channels])
+            writer.writerows(rows)
+    if args.metrics:
+        dashboard.export_mep_metrics(args.metrics, channels=channels)
+
+    print(f"\nTrials extracted: {len(rows)} of {len(recording.triggers)} triggers | packets lost: {stats['packets_lost']}")
+    if rows:
+        p2p = np.array([row[3:] for row in rows])
+        print(f"p2p mean (uV): {np.round(p2p.mean(axis=0), 2).tolist()} | std: {np.round(p2p.std(axis=0), 2).tolist()}")
+    for code in dashboard.mep_conditions.codes():
+        condition = dashboard.mep_conditions.get(code)
+        print(f"  code {code:3d}: {condition.count:5d} trials | p2p mean (uV): {np.round(condition.p2p_mean, 2).tolist()} "
+              f"| sem: {np.round(condition.p2p_sem, 2).tolist()}")
+    if sock is not None:
+        # The driver parses on its own thread: only the end-to-end rate is measurable from here,
+        # and it is not comparable with the in-memory parse rate
+        timed = wall_time - sleep_time
+        label = "end-to-end (UDP send + driver parse, sleeps excluded)"
+    else:
+        timed = processing_time
+        label = "parse"
+    print(f"Wall time {wall_time:.2f} s ({duration / wall_time:.1f}x real time) | {label} time {timed:.2f} s | "
+          f"{len(recording) / timed:,.0f} samples/s | {len(recording) * num_channels / timed:,.0f} channel-samples/s")
+
+
+if __name__ == '__main__':
+    main()
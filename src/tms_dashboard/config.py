@@ -15,9 +15,22 @@ OBJECTS_DIR = STATIC_DIR / "objects"
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 5000
 
+# Inbound Socket.IO buffer: beyond SOCKET_BUFFER_SIZE messages, pose topics are dropped
+# ('drop_oldest' evicts the oldest queued pose, 'drop_newest' refuses the incoming one);
+# other (control) topics are never dropped
+SOCKET_BUFFER_SIZE = 2048
+SOCKET_OVERFLOW_POLICY = 'drop_oldest'
+SOCKET_DROPPABLE_TOPICS = (
+    'From Neuronavigation: Update tracker poses',
+    'From Neuronavigation: Send coil pose',
+    'Neuronavigation to Robot: Update displacement to target',
+)
+
 # NiceGUI settings
 NICEGUI_PORT = 8084
 NICEGUI_RELOAD = False
+UI_MIN_UPDATE_INTERVAL = 0.03  # Seconds between two UI refreshes of a client during bursts of state changes
+UI_IDLE_REFRESH = 1.0  # Seconds after which a client refreshes even without state changes
 
 # CSV output settings
 CSV_FILE = 'nice_details.csv'
@@ -26,6 +39,36 @@ CSV_PATH = DATA_DIR / CSV_FILE
 # Ensure data directory exists
 DATA_DIR.mkdir(exist_ok=True)
 
+# MEP trial history: windows beyond the newest MEP_HISTORY_RAM_TRIALS are kept on disk
+MEP_HISTORY_RAM_TRIALS = 200
+MEP_HISTORY_DIR = None  # Folder of the temporary spill files (None = system temp folder)
+
+# MEP quality gating: 'flag' marks bad trials, 'drop' discards them, None disables the checks.
+# In both modes rejected trials are NOT sent to neuronavigation (each one is logged);
+# 'flag' keeps them in the history and plots them dotted
+MEP_QUALITY_ACTION = 'flag'
+MEP_MAX_PRE_RMS_UV = 20.0  # Pre-trigger muscle activity
+MEP_SATURATION_FRACTION = 0.95  # Amplifier saturation, as a fraction of each channel's full scale
+MEP_MAX_ARTIFACT_UV = None  # TMS artifact in the first 5 ms (None = not checked)
+
 NEURONE_IP = '192.168.200.220'
 NEURONE_PORT = 50000
+NEURONE_CHANNELS = (33,)  # Physical channel ids acquired, one per recorded muscle
+NEURONE_BUFFER_SECONDS = 300  # Length of the raw EMG ring buffer (4 bytes/sample/channel)
+NEURONE_RCVBUF_BYTES = 16 * 1024 * 1024  # Kernel UDP receive buffer requested for the stream
+NEURONE_QUEUE_SIZE = 4096  # Datagrams buffered between the receive and parse stages
+
+# Optional streaming filter applied to the EMG as packets arrive
+NEURONE_FILTER_ENABLED = False
+NEURONE_NOTCH_HZ = 60.0  # Power line frequency (None disables the notch)
+NEURONE_BANDPASS_HZ = (10.0, 1000.0)  # (high-pass, low-pass) cutoffs, either may be None
+
+# Raw EMG recording of every measurement (samples, triggers and header per session)
+NEURONE_RECORD_ENABLED = False
+NEURONE_RECORDING_DIR = DATA_DIR / "emg_recordings"
+NEURONE_RECORDER_QUEUE_SIZE = 8192  # Sample blocks buffered before the recorder starts dropping
+
 
+# Run NeurOne acquisition in a separate process sharing the ring buffer through shared memory
+NEURONE_ACQUISITION_PROCESS = False
+NEURONE_MAX_SAMPLING_RATE = 20000  # Sizes the shared ring buffer and window slots
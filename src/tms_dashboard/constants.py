@@ -4,6 +4,7 @@ from typing import List
 
 JOIN_PORT = 5050
 BUFFER_SIZE = 65535
+SAMPLES_HEADER_SIZE = 28  # Bytes before the first bundle of a SAMPLES frame
 
 class TriggerType(Enum):
     DISABLED = 0
@@ -4,10 +4,19 @@
 
 from dataclasses import dataclass
 from collections import deque
+import csv
+import threading
 import time
 import numpy as np
 
-from tms_dashboard.utils.signal_processing import set_apply_baseline_all, new_indexes_fast_tol, p2p_from_time
+from tms_dashboard.utils.signal_processing import baseline_correct_batch, p2p_batch, mep_metrics_batch, MEP_METRICS_DTYPE
+from tms_dashboard.utils.growable_array import GrowableArray
+from tms_dashboard.utils.trial_store import TrialStore
+from tms_dashboard.utils.condition_stats import ConditionIndex
+from tms_dashboard.utils.mep_quality import MEPQualityConfig, assess_quality_batch
+from tms_dashboard.utils.state_notifier import StateNotifier
+from tms_dashboard.config import MEP_HISTORY_RAM_TRIALS, MEP_HISTORY_DIR, MEP_QUALITY_ACTION, MEP_MAX_PRE_RMS_UV, \
+    MEP_SATURATION_FRACTION, MEP_MAX_ARTIFACT_UV
 
 
 @dataclass
@@ -22,6 +31,10 @@ class DashboardState:
     """
     
     def __init__(self):
+        # Bumped by the processing threads after each change; kept across resets so UI waiters stay attached
+        self.notifier = StateNotifier()
+        # Serializes MEP history updates (MEP fast path) with resets from other threads
+        self.mep_lock = threading.RLock()
         self.__set_init_state()
     
     def __set_init_state(self):
@@ -88,13 +101,42 @@ class DashboardState:
 
         # Motor evoked potentials plots and history
         # UI-specific plots are now in DashboardUI (per client)
+        # Windows are (trials, channels, samples), p2p values are (trials, channels)
+        # The public attributes are read-only views of the append-only arrays below.
+        # Windows of older trials are spilled to disk: mep_history and mep_history_baseline
+        # hold the newest ones only (use read_mep_windows for any range), p2p and ids hold all
+        self._mep_windows = TrialStore(MEP_HISTORY_RAM_TRIALS, MEP_HISTORY_DIR)
+        self._mep_windows_baseline = TrialStore(MEP_HISTORY_RAM_TRIALS, MEP_HISTORY_DIR)
+        self._mep_p2p = GrowableArray(np.float32)
+        self._mep_trial_ids = GrowableArray(np.int64)
+        self._mep_trigger_codes = GrowableArray(np.uint8)
+        self._mep_sample_indexes = GrowableArray(np.int64)  # Trigger samples, to re-extract windows
+        self._mep_reject_flags = GrowableArray(np.uint8)
+        self._mep_metrics = GrowableArray(MEP_METRICS_DTYPE)
+        self._mep_window_params = None  # (t_min_ms, t_max_ms, sampling_rate) of the processed trials
         self.mep_history = []
         self.mep_history_baseline = []
         self.mep_p2p_history_baseline = []
+        self.mep_trial_ids = []
+        self.mep_trigger_codes = []
+        self.mep_conditions = ConditionIndex()  # Running statistics per trigger code (accepted trials)
+        # Quality gating: 'flag' keeps rejected trials in the history, 'drop' discards them, None disables it.
+        # Rejected trials are never sent to neuronavigation nor counted in the condition statistics
+        self.mep_quality_action = MEP_QUALITY_ACTION
+        self.mep_quality_config = MEPQualityConfig(max_pre_rms_uv=MEP_MAX_PRE_RMS_UV, saturation_fraction=MEP_SATURATION_FRACTION,
+                                                   max_artifact_uv=MEP_MAX_ARTIFACT_UV)
+        self.mep_reject_flags = []  # Per trial OR of mep_quality.REJECT_* bits, 0 when accepted
+        self.mep_dropped_trials = 0
+        self.mep_metrics = []  # (trials, channels) MEP_METRICS_DTYPE records, times relative to the trigger
+        self.mep_channels = []
+        self.mep_scale_factors = None  # uV/bit of each channel of mep_channels, sets the saturation level
+        self.mep_display_channel = 0  # Channel index plotted and sent to neuronavigation
+        self.mep_baseline_start_ms = 5
+        self.mep_baseline_end_ms = 20
         self.mep_sampling_rate = None
         self.status_new_mep = False
         self.status_new_mep_2 = False
-        self.new_meps_index = []
+        self.new_meps_index = np.arange(0)
         
         # Experiment metadata with default values
         self.experiment_name = 'Paired pulse, dual site, bilateral, leftM1-rightPMv'
@@ -140,63 +182,281 @@ class DashboardState:
         self.wait_for_stl = False
 
     def reset_state(self):
-        self.__set_init_state()
+        with self.mep_lock:
+            self.__set_init_state()
         print("Dashboard reseted")
     
-    def add_displacement_sample(self):
+    def add_displacement_sample(self, displacement=None):
         """Add current displacement and rotation values to history for time series plotting.
         
         This method is called whenever new displacement data is received.
         It automatically maintains a rolling window of the last max_history_length samples.
+
+        Args:
+            displacement: Sample to append (x, y, z, rx, ry, rz); None uses the current displacement
         """
+        if displacement is None:
+            displacement = self.displacement
+
         # Calculate elapsed time in seconds
         elapsed_time = time.time() - self._start_time
         
         # Add current displacement values (x, y, z)
-        self.displacement_history_x.append(float(self.displacement[0]))
-        self.displacement_history_y.append(float(self.displacement[1]))
-        self.displacement_history_z.append(float(self.displacement[2]))
+        self.displacement_history_x.append(float(displacement[0]))
+        self.displacement_history_y.append(float(displacement[1]))
+        self.displacement_history_z.append(float(displacement[2]))
         self.displacement_time_history.append(elapsed_time)
         
         # Add current rotation values (rx, ry, rz - indices 3, 4, 5)
-        self.rotation_history_rx.append(float(self.displacement[3]))
-        self.rotation_history_ry.append(float(self.displacement[4]))
-        self.rotation_history_rz.append(float(self.displacement[5]))
+        self.rotation_history_rx.append(float(displacement[3]))
+        self.rotation_history_ry.append(float(displacement[4]))
+        self.rotation_history_rz.append(float(displacement[5]))
         self.rotation_time_history.append(elapsed_time)
         
         if self.status_new_mep_2:
             self.trigged_times.append(elapsed_time)
             self.status_new_mep_2 = False
 
-    def update_mep_history(self, new_mep_history, t_min, t_max, sampling_rate):
-        if len(new_mep_history) == 0:
-            return
-        if np.array_equal(new_mep_history, self.mep_history):
-            return
-        
-        self.new_meps_index = new_indexes_fast_tol(self.mep_history, new_mep_history)
-
-        self.mep_history = new_mep_history
-        self.mep_history_baseline = set_apply_baseline_all(
-                                baseline_start_ms=5,      # Baseline start at 5ms
-                                baseline_end_ms=20,        # Baseline end at 20ms
-                                signal_start_ms= t_min,  # Signal starts at -10ms
-                                signal_end_ms= t_max,    # Signal ends at 40ms
-                                data_windows=new_mep_history, 
-                                sampling_rate=sampling_rate
-                            )
-        self.mep_p2p_history_baseline = [p2p_from_time(mep, self.mep_sampling_rate, t_min) for mep in self.mep_history_baseline]
+    def update_mep_history(self, new_windows, t_min, t_max, sampling_rate):
+        """Appends newly captured trials to the MEP history.
+
+        Only the new trials are baseline-corrected and measured, in one batch.
+        The whole history is reprocessed only when the window parameters change.
+
+        Args:
+            new_windows: TriggeredWindows batch holding only trials not seen before
+            t_min: Window start relative to the trigger, in seconds (neuroOne.t_min)
+            t_max: Window end relative to the trigger, in seconds (neuroOne.t_max)
+            sampling_rate: Sampling rate in Hz
+
+        Returns:
+            History indexes of the trials added (rejected trials are not added in 'drop' mode)
+        """
+        # Only trials of this batch are ever reported as new
+        self.new_meps_index = np.arange(0)
+        if len(new_windows) == 0:
+            return np.arange(0)
+
+        n_old = len(self._mep_windows)
+        # A new measurement may change the window geometry (sampling rate, channels)
+        if n_old and self._mep_windows.row_shape != new_windows.windows.shape[1:]:
+            self.__clear_mep_arrays()
+            n_old = 0
+
+        windows, trial_ids = new_windows.windows, new_windows.trial_ids
+        codes, sample_indexes = new_windows.trigger_codes, new_windows.sample_indexes
+        # Every batch computation works in ms relative to the trigger
+        params = (t_min * 1000, t_max * 1000, sampling_rate)
+        flags = None
+        if self.mep_quality_action is not None:
+            flags = assess_quality_batch(windows, sampling_rate, params[0], self.mep_quality_config,
+                                         self.mep_scale_factors).reject_flags
+            rejected = flags != 0
+            if rejected.any():
+                kept = 'dropped' if self.mep_quality_action == 'drop' else 'kept in the history'
+                print(f"MEP trial(s) {trial_ids[rejected].tolist()} rejected by the quality checks: "
+                      f"{kept}, not sent to neuronavigation")
+            if self.mep_quality_action == 'drop' and rejected.any():
+                accepted = ~rejected
+                self.mep_dropped_trials += int(rejected.sum())
+                windows, trial_ids = windows[accepted], trial_ids[accepted]
+                codes, sample_indexes, flags = codes[accepted], sample_indexes[accepted], flags[accepted]
+                if len(windows) == 0:
+                    return np.arange(0)
+
+        if params != self._mep_window_params:
+            # Older trials are reprocessed before the new ones are added
+            self._mep_window_params = params
+            self.__reprocess_mep_history()
+
+        self._mep_windows.append(windows)
+        self._mep_trial_ids.append(trial_ids)
+        self._mep_trigger_codes.append(codes)
+        self._mep_sample_indexes.append(sample_indexes)
+        self.__append_processed(n_old, windows, flags)
+
+        self.__publish_mep_views()
+        new_indexes = np.arange(n_old, len(self._mep_windows))
+        self.new_meps_index = new_indexes[self._mep_reject_flags.values[n_old:] == 0]
         self.status_new_mep = self.status_new_mep_2 = True
+        return new_indexes
+
+    def set_mep_baseline(self, baseline_start_ms, baseline_end_ms):
+        """Changes the baseline interval and reprocesses the stored trials."""
+        self.mep_baseline_start_ms = baseline_start_ms
+        self.mep_baseline_end_ms = baseline_end_ms
+        if self._mep_window_params is not None and len(self._mep_windows):
+            self.__reprocess_mep_history()
+            self.__publish_mep_views()
+            self.status_new_mep = True
+
+    def reextract_mep_history(self, extract_windows, t_min, t_max, sampling_rate, chunk_size=256):
+        """Rebuilds the stored trials after the acquisition window or channels changed.
+
+        Windows are extracted again around the stored trigger samples, chunk by
+        chunk with one vectorized gather each; trials whose samples are no
+        longer available are dropped.
+
+        Args:
+            extract_windows: Callable mapping trigger sample indexes to (windows, valid),
+                such as neuroOne.extract_windows
+            t_min: New window start relative to the trigger, in seconds (neuroOne.t_min)
+            t_max: New window end relative to the trigger, in seconds (neuroOne.t_max)
+            sampling_rate: Sampling rate in Hz
+            chunk_size: Trials extracted per pass
+        """
+        trial_ids = self._mep_trial_ids.values
+        codes = self._mep_trigger_codes.values
+        sample_indexes = self._mep_sample_indexes.values
+        # The old arrays stay alive through the views above while the new ones are filled
+        self.__clear_mep_arrays()
+
+        for start in range(0, len(sample_indexes), chunk_size):
+            stop = start + chunk_size
+            windows, valid = extract_windows(sample_indexes[start:stop])
+            if valid.any():
+                self._mep_windows.append(windows[valid])
+                self._mep_trial_ids.append(trial_ids[start:stop][valid])
+                self._mep_trigger_codes.append(codes[start:stop][valid])
+                self._mep_sample_indexes.append(sample_indexes[start:stop][valid])
+
+        dropped = len(sample_indexes) - len(self._mep_windows)
+        if dropped:
+            print(f"{dropped} MEP trial(s) no longer in the EMG buffer were dropped")
+
+        self._mep_window_params = (t_min * 1000, t_max * 1000, sampling_rate)
+        self.__reprocess_mep_history()
+        self.__publish_mep_views()
+        self.new_meps_index = np.arange(0)
+        self.status_new_mep = True
+
+    def __process_meps(self, windows):
+        """Baseline-corrects windows and measures their p2p in one batch."""
+        t_min_ms, _, sampling_rate = self._mep_window_params
+        baseline, _ = baseline_correct_batch(windows, self.mep_baseline_start_ms, self.mep_baseline_end_ms, t_min_ms, sampling_rate)
+        p2p = p2p_batch(baseline, sampling_rate, t_min_ms)
+        return baseline, np.round(p2p.amplitude, 2)
+
+    def __append_processed(self, start, windows, flags=None):
+        """Processes trials [start, start + len(windows)) and adds them to the derived histories.
+
+        Reject flags already computed for these windows are passed in flags.
+        """
+        baseline, p2p = self.__process_meps(windows)
+        self._mep_windows_baseline.append(baseline)
+        self._mep_p2p.append(p2p)
+
+        t_min_ms, _, sampling_rate = self._mep_window_params
+        if self.mep_quality_action is None:
+            flags = np.zeros(len(windows), dtype=np.uint8)
+        elif flags is None:
+            flags = assess_quality_batch(windows, sampling_rate, t_min_ms, self.mep_quality_config,
+                                         self.mep_scale_factors).reject_flags
+        self._mep_reject_flags.append(flags)
+        self._mep_metrics.append(mep_metrics_batch(baseline, sampling_rate, t_min_ms))
+
+        stop = start + len(windows)
+        accepted = flags == 0
+        self.mep_conditions.update(self._mep_trigger_codes.values[start:stop][accepted], np.arange(start, stop)[accepted],
+                                   baseline[accepted], p2p[accepted])
+
+    def __reprocess_mep_history(self):
+        self._mep_windows_baseline.clear()
+        self._mep_p2p.clear()
+        self._mep_reject_flags.clear()
+        self._mep_metrics.clear()
+        self.mep_conditions.clear()
+        # Chunked so spilled trials are never loaded all at once
+        start = 0
+        for windows in self._mep_windows.iter_chunks():
+            self.__append_processed(start, windows)
+            start += len(windows)
+
+    @property
+    def mep_window_shape(self):
+        """(channels, samples) of the stored trials, None while the history is empty."""
+        return self._mep_windows.row_shape if len(self._mep_windows) else None
+
+    def read_mep_windows(self, start, stop, baseline=True):
+        """Returns the windows of trials [start, stop) of the session, from RAM or disk.
+
+        Args:
+            start: Index of the first trial (same indexing as mep_p2p_history_baseline)
+            stop: Index one past the last trial
+            baseline: Whether to return baseline-corrected windows
+
+        Returns:
+            Array shaped (trials, channels, samples)
+        """
+        store = self._mep_windows_baseline if baseline else self._mep_windows
+        return store.read(start, stop)
+
+    def export_mep_metrics(self, path, channels=None):
+        """Writes one CSV row per trial and channel with the precomputed MEP metrics.
+
+        The 'amplitude' column is the p2p sent to neuronavigation (same window and
+        baseline), unrounded.
+
+        Args:
+            path: Output CSV file
+            channels: Physical channel ids of the window channels, in order; defaults to mep_channels
+
+        Raises:
+            ValueError: If the channel ids are missing or do not match the stored trials
+        """
+        metrics = self._mep_metrics.values
+        num_channels = metrics.shape[1] if len(metrics) else 0
+        channels = list(self.mep_channels if channels is None else channels)
+        if len(metrics) and len(channels) != num_channels:
+            raise ValueError(f"{len(channels)} channel id(s) given for {num_channels} stored channel(s)")
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['trial_id', 'sample_idx', 'code', 'reject_flags', 'channel'] + list(MEP_METRICS_DTYPE.names))
+            for i in range(len(metrics)):
+                trial = [int(self._mep_trial_ids.values[i]), int(self._mep_sample_indexes.values[i]),
+                         int(self._mep_trigger_codes.values[i]), int(self._mep_reject_flags.values[i])]
+                for ch_idx, ch in enumerate(channels):
+                    values = [round(float(value), 3) for value in metrics[i, ch_idx].tolist()]
+                    writer.writerow(trial + [ch] + values)
+
+    def __publish_mep_views(self):
+        self.mep_history = self._mep_windows.recent
+        self.mep_history_baseline = self._mep_windows_baseline.recent
+        self.mep_p2p_history_baseline = self._mep_p2p.values
+        self.mep_trial_ids = self._mep_trial_ids.values
+        self.mep_trigger_codes = self._mep_trigger_codes.values
+        self.mep_reject_flags = self._mep_reject_flags.values
+        self.mep_metrics = self._mep_metrics.values
+
+    def __clear_mep_arrays(self):
+        self._mep_windows.clear()
+        self._mep_windows_baseline.clear()
+        self._mep_p2p.clear()
+        self._mep_trial_ids.clear()
+        self._mep_trigger_codes.clear()
+        self._mep_sample_indexes.clear()
+        self._mep_reject_flags.clear()
+        self._mep_metrics.clear()
+        self.mep_conditions.clear()
+        self._mep_window_params = None
     
     def get_all_state_mep(self):
-        if self.mep_history == [] and self.mep_history_baseline == [] and self.mep_sampling_rate == None and self.status_new_mep == False and self.new_meps_index == []:
+        if len(self.mep_history) == 0 and len(self.mep_history_baseline) == 0 and self.mep_sampling_rate == None and self.status_new_mep == False and len(self.new_meps_index) == 0:
             return False
         else:
             return True
         
     def reset_all_state_mep(self):
-        self.mep_history = []
-        self.mep_history_baseline = []
-        self.mep_sampling_rate = None
-        self.status_new_mep = False
-        self.new_meps_index = []
+        with self.mep_lock:
+            self.__clear_mep_arrays()
+            self.mep_history = []
+            self.mep_history_baseline = []
+            self.mep_p2p_history_baseline = []
+            self.mep_trial_ids = []
+            self.mep_trigger_codes = []
+            self.mep_reject_flags = []
+            self.mep_dropped_trials = 0
+            self.mep_metrics = []
+            self.mep_sampling_rate = None
+            self.status_new_mep = False
+            self.new_meps_index = np.arange(0)
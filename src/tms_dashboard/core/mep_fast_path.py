@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Event-driven MEP processing: from completed window to neuronavigation without polling"""
+
+import queue
+import threading
+import time
+
+from tms_dashboard.core.modules.emg_connection import TriggeredWindows
+from tms_dashboard.utils.latency_histogram import LatencyHistogram
+
+
+class MEPFastPath:
+    """Processes triggered windows as soon as the EMG driver completes them.
+
+    The driver's subscriber callback only enqueues the batch, so the parser
+    thread is never held up. A dedicated thread then updates the
+    DashboardState history (new trials only) and sends their p2p to
+    neuronavigation right away. Live reconfiguration requests go through the
+    same queue; every MEP update holds dashboard.mep_lock, which
+    DashboardState.reset_state() also takes when called from other threads.
+
+    Batches queued before a reconfiguration were cut with the old window
+    or channels: they are extracted again with the new settings instead of
+    replacing the reconfigured history.
+
+    Two latency histograms are kept: from the TRIGGER frame being parsed to
+    the emit, and from the window being completed to the emit.
+    """
+
+    def __init__(self, emg_connection, dashboard, message_emit):
+        self.__emg = emg_connection
+        self.__dashboard = dashboard
+        self.__message_emit = message_emit
+        self.__queue = queue.Queue()
+        self.__thread = None
+        self.__running = False
+        self.__generation = 0  # Bumped by each reconfiguration; batches carry the value they were queued with
+
+        self.trigger_to_emit = LatencyHistogram()
+        self.completion_to_emit = LatencyHistogram()
+        self.batches_processed = 0
+
+    def start(self):
+        if self.__thread is None:
+            self.__running = True
+            self.__emg.subscribe(self.__on_windows)
+            self.__thread = threading.Thread(target=self.__loop, daemon=True, name="MEP-FastPath")
+            self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        self.__emg.unsubscribe(self.__on_windows)
+        if self.__thread is not None:
+            self.__queue.put(None)
+            self.__thread.join()
+            self.__thread = None
+
+    def request_reconfigure(self, t_min=None, t_max=None, channels=None, num_trial=None,
+                            baseline_start_ms=None, baseline_end_ms=None):
+        """Queues a change of the MEP window (ms), channels, driver history or baseline.
+
+        Arguments left as None are kept. The NeurOne socket stays open and the
+        trials already captured are re-extracted with the new settings.
+        """
+        self.__queue.put(('reconfigure', dict(t_min=t_min, t_max=t_max, channels=channels, num_trial=num_trial,
+                                              baseline_start_ms=baseline_start_ms, baseline_end_ms=baseline_end_ms)))
+
+    def get_statistics(self):
+        return {
+            'batches_processed': self.batches_processed,
+            'queue_depth': self.__queue.qsize(),
+            'trigger_to_emit': self.trigger_to_emit.summary(),
+            'completion_to_emit': self.completion_to_emit.summary(),
+        }
+
+    def __on_windows(self, batch):
+        # Runs on the driver's parser thread: hand over only
+        self.__queue.put(('windows', (batch, time.perf_counter(), self.__generation)))
+
+    def __loop(self):
+        while self.__running:
+            try:
+                item = self.__queue.get(timeout=0.5)
+            except queue.Empty:
+                self.__check_connection()
+                continue
+            if item is None:
+                break
+
+            kind, payload = item
+            try:
+                if kind == 'windows':
+                    self.__process_windows(*payload)
+                else:
+                    self.__apply_reconfigure(payload)
+            except Exception as e:
+                print(f"Error in MEP fast path: {e}")
+
+    def __process_windows(self, batch, completed_at, generation):
+        emg, dashboard = self.__emg, self.__dashboard
+        with dashboard.mep_lock:
+            shape = dashboard.mep_window_shape
+            if generation != self.__generation or (shape is not None and batch.windows.shape[1:] != shape):
+                batch = self.__reextract(batch)
+            dashboard.mep_sampling_rate = emg.get_sampling_rate()
+            dashboard.mep_channels = emg.get_channels()
+            dashboard.mep_scale_factors = emg.get_scale_factors()
+            dashboard.update_mep_history(batch, emg.t_min, emg.t_max, dashboard.mep_sampling_rate)
+            new_meps = dashboard.mep_p2p_history_baseline[dashboard.new_meps_index] if len(dashboard.new_meps_index) else None
+        if new_meps is not None:
+            self.__message_emit.send_mep_value(new_meps)
+        dashboard.notifier.notify()
+
+        emitted_at = time.perf_counter()
+        self.completion_to_emit.record((emitted_at - completed_at) * 1000)
+        if batch.trigger_times is not None:
+            self.trigger_to_emit.record((emitted_at - batch.trigger_times) * 1000)
+        self.batches_processed += 1
+
+    def __reextract(self, batch):
+        """Cuts the windows of a batch again with the driver's current window and channels.
+
+        A batch from a new measurement keeps its new geometry, so the history
+        is then restarted as usual; trials no longer in the buffer are dropped.
+        """
+        windows, valid = self.__emg.extract_windows(batch.sample_indexes)
+        return TriggeredWindows(
+            trial_ids=batch.trial_ids[valid],
+            sample_indexes=batch.sample_indexes[valid],
+            trigger_codes=batch.trigger_codes[valid],
+            windows=windows[valid],
+            cursor=batch.cursor,
+            trigger_times=None if batch.trigger_times is None else batch.trigger_times[valid],
+        )
+
+    def __check_connection(self):
+        if not (self.__emg.get_connection() and self.__emg.get_status()) and self.__dashboard.get_all_state_mep():
+            self.__dashboard.reset_all_state_mep()
+            self.__dashboard.notifier.notify()
+
+    def __apply_reconfigure(self, changes):
+        emg, dashboard = self.__emg, self.__dashboard
+        baseline_start = changes.pop('baseline_start_ms')
+        baseline_end = changes.pop('baseline_end_ms')
+        baseline_changed = baseline_start is not None or baseline_end is not None
+        if baseline_start is None:
+            baseline_start = dashboard.mep_baseline_start_ms
+        if baseline_end is None:
+            baseline_end = dashboard.mep_baseline_end_ms
+
+        if any(value is not None for value in changes.values()):
+            emg.reconfigure(**changes)
+            # Batches already queued were cut with the old settings
+            self.__generation += 1
+            with dashboard.mep_lock:
+                # Re-extraction reprocesses the history once, with the new baseline already in place
+                dashboard.mep_baseline_start_ms, dashboard.mep_baseline_end_ms = baseline_start, baseline_end
+                dashboard.mep_channels = emg.get_channels()
+                dashboard.mep_scale_factors = emg.get_scale_factors()
+                dashboard.reextract_mep_history(emg.extract_windows, emg.t_min, emg.t_max, emg.get_sampling_rate())
+        elif baseline_changed:
+            with dashboard.mep_lock:
+                dashboard.set_mep_baseline(baseline_start, baseline_end)
+        else:
+            return
+        dashboard.notifier.notify()
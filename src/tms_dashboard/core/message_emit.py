@@ -1,5 +1,7 @@
 import time
 
+import numpy as np
+
 from src.tms_dashboard.constants import BrainTargetModel
 
 class Message2Server():
@@ -46,8 +48,19 @@ class Message2Server():
     def check_robot_connection(self):
         self.__send_message2robot(topic="Neuronavigation to Robot: Check connection robot")
 
-    def send_mep_value(self, meps: list):
+    def send_mep_value(self, meps):
+        """Sends p2p amplitudes of new trials as brain targets.
+
+        Args:
+            meps: p2p values shaped (trials, channels); the dashboard display
+                channel is the one reported to neuronavigation
+        """
         if self.dashboard.at_target:
+            meps = np.asarray(meps, dtype=np.float64)
+            if meps.size == 0:
+                return
+            meps = meps.reshape(len(meps), -1)[:, self.dashboard.mep_display_channel].tolist()
+
             targets = []
             for mep in meps:
                 target = BrainTargetModel()
@@ -3,7 +3,8 @@
 """Message handler for processing navigation status updates"""
 import threading
 import numpy as np
-from typing import Optional
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
 import time
 
 from src.tms_dashboard.core.dashboard_state import DashboardState
@@ -11,6 +12,52 @@ from src.tms_dashboard.core.modules.socket_client import SocketClient
 from src.tms_dashboard.core.message_emit import Message2Server
 from src.tms_dashboard.core.robot_config_state import RobotConfigState
 
+# Camera-rate topics whose payload fully replaces the previous one: only the newest
+# message of each in a drained batch is handled, at the position it arrived
+DISPLACEMENT_TOPIC = 'Neuronavigation to Robot: Update displacement to target'
+CONFLATED_TOPICS = frozenset({
+    'From Neuronavigation: Update tracker poses',
+    'From Neuronavigation: Send coil pose',
+    DISPLACEMENT_TOPIC,
+})
+
+# Session lifecycle: 'Exit' resets the dashboard, then the old session's leftovers are drained
+SESSION_ACTIVE = 'active'
+SESSION_DRAINING = 'draining'
+NEW_SESSION_TOPICS = frozenset({'Project loaded successfully'})  # Ends draining at once
+SESSION_INDEPENDENT_PREFIXES = ('Robot to ',)  # Robot topics are kept while draining and replayed
+
+
+@dataclass
+class TopicStats:
+    """Receive and handling counters of one topic."""
+    received: int = 0
+    handled: int = 0
+    bytes_received: int = 0
+    total_time_s: float = 0.0
+    max_time_s: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            'received': self.received,
+            'handled': self.handled,
+            'bytes_received': self.bytes_received,
+            'total_time_ms': self.total_time_s * 1000,
+            'mean_time_ms': self.total_time_s * 1000 / self.handled if self.handled else 0.0,
+            'max_time_ms': self.max_time_s * 1000,
+        }
+
+
+def _payload_size(data) -> int:
+    """Approximate JSON size of a decoded payload: string lengths, 8 bytes per other scalar."""
+    if isinstance(data, str):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(len(key) + _payload_size(value) for key, value in data.items())
+    if isinstance(data, (list, tuple)):
+        return sum(_payload_size(value) for value in data)
+    return 8
+
 class MessageHandler:
     """Processes messages from socket client and updates dashboard state."""
     
@@ -28,7 +75,13 @@ class MessageHandler:
         self.robot_state = robot_state 
 
         self.target_status = None
-        self.neuronaviagator_status: bool = True
+
+        # Session lifecycle (see _handle_exit)
+        self.session_state = SESSION_ACTIVE
+        self._exit_drain_seconds = 3.0
+        self._drain_deadline = 0.0
+        self._held_messages = []
+        self.drained_messages = 0
 
         # Inactivity timeout: reset dashboard if no messages for 120s
         self._last_message_time = time.time()
@@ -37,32 +90,109 @@ class MessageHandler:
 
         self._debounce_seconds = 10
         self._surface_debounce_timer = None
+
+        # Superseded messages skipped per conflated topic
+        self.conflated_counts = {topic: 0 for topic in CONFLATED_TOPICS}
+
+        self._handlers = self._build_dispatch_table()
+        self._topic_stats: Dict[str, TopicStats] = {}
     
-    def process_messages(self) -> Optional[dict]:
+    def process_messages(self, timeout: Optional[float] = None) -> Optional[dict]:
         """Process all messages in buffer and update dashboard state.
         
+        Args:
+            timeout: None returns at once when the buffer is empty; otherwise waits
+                up to timeout seconds for messages, handling them as soon as they arrive
+        
         Returns:
             Last processed message or None if no messages
         """
-        buf = self.socket_client.get_buffer()
+        if self.session_state == SESSION_DRAINING and timeout is not None:
+            # Wake up in time to end draining at its deadline
+            timeout = max(0.0, min(timeout, self._drain_deadline - time.monotonic()))
+        buf = self.socket_client.get_buffer(timeout=timeout)
+        changed = self._check_drain_deadline() > 0
         
         if len(buf) == 0:
             # Check for inactivity timeout
-            if not self._timed_out and (time.time() - self._last_message_time) > self._timeout_seconds:
+            if self.session_state == SESSION_ACTIVE and not self._timed_out and \
+                    (time.time() - self._last_message_time) > self._timeout_seconds:
                 self.dashboard.reset_state()
                 self._timed_out = True
+                changed = True
+            if changed:
+                self.dashboard.notifier.notify()
             return None
         
         # Messages received — update timestamp and clear timeout flag
         self._last_message_time = time.time()
         self._timed_out = False
 
-        for message in buf:
+        # Position of the newest message of each conflated topic; events keep their order
+        newest = {}
+        for i, message in enumerate(buf):
+            if message['topic'] in CONFLATED_TOPICS:
+                newest[message['topic']] = i
+
+        for i, message in enumerate(buf):
             topic, data = message['topic'], message['data']
+            stats = self._topic_entry(topic)
+            stats.received += 1
+            stats.bytes_received += _payload_size(data)
+            if self.session_state == SESSION_DRAINING and not self._accept_while_draining(message):
+                continue
+            if newest.get(topic, i) != i:
+                self._skip_conflated(topic, data)
+                continue
             self._handle_message(topic, data)
+        self.dashboard.notifier.notify()
         
         return self.target_status
     
+    def _build_dispatch_table(self) -> Dict[str, Callable]:
+        """Maps each topic to its handler, called with the message data."""
+        return {
+            'Exit': self._handle_exit,
+            'Set image fiducial': self._handle_image_fiducial,
+            'Reset image fiducials': self._handle_reset_image_fiducials,
+            'Project loaded successfully': self._handle_project_loaded,
+            'Close Project': self._handle_close_project,
+            'From Neuronavigation: Send coil pose': self._handle_coil_poses,
+            'From Neuronavigation: Update tracker poses': self._handle_tracker_update,
+            DISPLACEMENT_TOPIC: self._handle_displacement_update,
+            'Tracker fiducials set': self._handle_tracker_fiducials_set,
+            'Reset tracker fiducials': self._handle_reset_tracker_fiducials,
+            "Robot to Neuronavigation: Robot connection status": self._handle_robot_connection_status,
+            'Open navigation menu': self._handle_open_navigation_menu,
+            "From Neuronavigation: Send target": self._handle_send_target,
+            "Neuronavigation to Robot: Unset target": self._handle_unset_target,
+            "Robot to Neuronavigation: Set objective": self._handle_set_objective,
+            'Coil at target': self._handle_coil_at_target,
+            "Press navigation button": self._handle_navigation_button,
+            "Robot to Neuronavigation: Send force sensor data": self._handle_force,
+            "Start navigation": self._handle_start_navigation,
+            "Stop navigation": self._handle_stop_navigation,
+            "Neuronavigation to Robot: Set free drive": self._handle_free_drive,
+            'Press move away button': self._handle_move_away_button,
+            "Press robot button": self._handle_robot_button,
+            "Robot to Neuronavigation: Initial config": self._handle_robot_initial_config,
+            "Robot to Dashboard: PID factors": self._handle_pid_factors,
+            "Neuronavigation to Dashboard: Send surface": self._handle_surface_update,
+            "Fold surface task": self._handle_fold_surface_task,
+            "Set surface colour": self._handle_material_surface,
+            "Set surface transparency": self._handle_material_surface,
+            "Remove surfaces": self._handle_remove_surfaces,
+        }
+
+    def register_handler(self, topic: str, handler: Callable):
+        """Adds or replaces the handler of a topic.
+
+        Args:
+            topic: Message topic string
+            handler: Callable receiving the message data
+        """
+        self._handlers[topic] = handler
+
     def _handle_message(self, topic: str, data):
         """Handles individual message based on topic.
         
@@ -70,142 +200,201 @@ class MessageHandler:
             topic: Message topic string
             data: Message data payload
         """
+        handler = self._handlers.get(topic)
+        if handler is None:
+            return
 
-        if self.neuronaviagator_status:
-
-            match topic:
-
-                #IMPORTANT: THIS TOPIC MUST BE THE FIRST
-                case 'Exit':
-                    self.neuronaviagator_status = False
-                    self.dashboard.reset_state()
-                    time.sleep(3)
-                    self.socket_client.clear_buffer()
-                    self.neuronaviagator_status = True
-
-                case 'Set image fiducial':
-                    self._handle_image_fiducial(data)
-                
-                case 'Reset image fiducials':
-                    self.dashboard.image_fiducials = False
-                
-                case 'Project loaded successfully':
-                    self.dashboard.project_set = True
-                
-                case 'Close Project':
-                    self.dashboard.project_set = False
-
-                case 'From Neuronavigation: Send coil pose':
-                    self._handle_coil_poses(data)
-
-                case 'From Neuronavigation: Update tracker poses':
-                    self._handle_tracker_poses(data)
-
-                    if any(data['visibilities']):
-                        self.dashboard.camera_set = True
-
-                        self.dashboard.probe_visible = data['visibilities'][0]
-                        self.dashboard.head_visible = data['visibilities'][1]
-                        self.dashboard.coil_visible = data['visibilities'][2]
-
-                    else:
-                        self.dashboard.camera_set = False
-                        self.dashboard.probe_visible = False
-                        self.dashboard.head_visible = False
-                        self.dashboard.coil_visible = False
-                    
-                case 'Neuronavigation to Robot: Update displacement to target':
-                    self._handle_displacement(data)
-
-                    self.dashboard.navigation_button_pressed = True
-                    self.dashboard.target_set = True
-                    self.dashboard.image_fiducials = True
-                    self.dashboard.tracker_fiducials = True
-                
-                case 'Tracker fiducials set':
-                    self.dashboard.tracker_fiducials = True
-                
-                case 'Reset tracker fiducials':
-                    self.dashboard.tracker_fiducials = False
-                
-                case "Robot to Neuronavigation: Robot connection status":
-                    self.dashboard.robot_set = True if data['data'] == 'Connected' else False
-                
-                case 'Open navigation menu':
-                    self.dashboard.matrix_set = True
-                
-                case "From Neuronavigation: Send target":
-                    self.dashboard.target_set = True
-                    
-                    # Extract target position from transformation matrix
-                    if 'target' in data:
-                        target = np.array(data['target'])
-                        self._handle_target_position(target)
-
-                case "Neuronavigation to Robot: Unset target":
-                    self.dashboard.target_set = False
-                    self.dashboard.target_location = (0, 0, 0, 0, 0, 0)
-
-                case "Robot to Neuronavigation: Set objective":
-                    self.dashboard.robot_moving = False if data["objective"] == 0 else True
-
-                    if not self.dashboard.robot_set and self.dashboard.robot_moving:
-                        self.message_emit.check_robot_connection()
-                
-                case 'Coil at target':
-                    if data['state'] == True:
-                        self.dashboard.at_target = True
-                    else:
-                        self.dashboard.at_target = False
-
-                case "Press navigation button":
-                    self.dashboard.navigation_button_pressed = data["cond"]
-                
-                case "Robot to Neuronavigation: Send force sensor data":
-                    self.dashboard.force = data["force_feedback"]
-                    if not self.dashboard.robot_set:
-                        self.message_emit.check_robot_connection()
-        
-                case "Start navigation":
-                    self.dashboard.navigation_button_pressed = True
-
-                case "Stop navigation":
-                    self.dashboard.navigation_button_pressed = False
-
-                case "Neuronavigation to Robot: Set free drive":
-                    pressed = data["set"]
-                    self.dashboard.free_drive_robot_pressed = pressed
-                
-                case 'Press move away button':
-                    pressed = data['pressed']
-                    self.dashboard.move_upward_robot_pressed = pressed
-
-                case "Press robot button":
-                    pressed = data['pressed']
-                    self.dashboard.active_robot_pressed = pressed
-
-                case "Robot to Neuronavigation: Initial config":
-                    self.robot_state.sync_from_embedded(data['config'])
-                
-                case "Robot to Dashboard: PID factors":
-                    if 'pid_factors' in data:
-                        self.robot_state._sync_pids(data['pid_factors'])
-
-                case "Neuronavigation to Dashboard: Send surface":
-                    self._handle_surface_stl(data)
-                    self.dashboard.wait_for_stl = False
-
-                case "Fold surface task":
-                    self._debounce_surface_request()
-                
-                case "Set surface colour" | "Set surface transparency":
-                    self._handle_material_surface(data)
-                
-                case "Remove surfaces":
-                    surface_indexes = data.get("surface_indexes", None)
-                    if surface_indexes:
-                        for index in surface_indexes:
-                            self.dashboard.stl_urls.pop(index, None)
+        start = time.perf_counter()
+        handler(data)
+        elapsed = time.perf_counter() - start
+        stats = self._topic_entry(topic)
+        stats.handled += 1
+        stats.total_time_s += elapsed
+        stats.max_time_s = max(stats.max_time_s, elapsed)
+
+    def _topic_entry(self, topic: str) -> TopicStats:
+        stats = self._topic_stats.get(topic)
+        if stats is None:
+            stats = self._topic_stats[topic] = TopicStats()
+        return stats
+
+    def get_topic_statistics(self) -> dict:
+        """Returns per-topic counters, the topics using most handling time first.
+
+        Returns:
+            {topic: {'received', 'handled', 'bytes_received', 'total_time_ms', 'mean_time_ms', 'max_time_ms'}}
+        """
+        ranked = sorted(self._topic_stats.items(), key=lambda item: item[1].total_time_s, reverse=True)
+        return {topic: stats.as_dict() for topic, stats in ranked}
+
+    def reset_topic_statistics(self):
+        self._topic_stats.clear()
+
+    @property
+    def neuronaviagator_status(self) -> bool:
+        return self.session_state == SESSION_ACTIVE
+
+    def _handle_exit(self, data):
+        """Resets the dashboard and drains the closed session without blocking the consumer.
+
+        Until the drain deadline, or until a new session announces itself,
+        neuronavigation messages are discarded as leftovers of the closed
+        session, so they cannot fill the reset state back in. Robot messages
+        do not depend on the session: they are held and replayed when
+        draining ends. Messages after the new-session marker are handled as usual.
+        """
+        self.dashboard.reset_state()
+        self.session_state = SESSION_DRAINING
+        self._drain_deadline = time.monotonic() + self._exit_drain_seconds
+        self._held_messages = []
+
+    def _accept_while_draining(self, message) -> bool:
+        """Routes a message received while draining; True when it is to be handled now."""
+        topic = message['topic']
+        if topic in NEW_SESSION_TOPICS:
+            self._finish_drain()
+            return True
+        if topic.startswith(SESSION_INDEPENDENT_PREFIXES):
+            self._held_messages.append(message)
+        else:
+            self.drained_messages += 1
+        return False
+
+    def _check_drain_deadline(self) -> int:
+        if self.session_state == SESSION_DRAINING and time.monotonic() >= self._drain_deadline:
+            return self._finish_drain()
+        return 0
+
+    def _finish_drain(self) -> int:
+        """Reactivates the session and replays the held robot messages in arrival order.
+
+        Returns:
+            Number of messages replayed
+        """
+        self.session_state = SESSION_ACTIVE
+        held, self._held_messages = self._held_messages, []
+        for message in held:
+            self._handle_message(message['topic'], message['data'])
+        return len(held)
+
+    def _handle_reset_image_fiducials(self, data):
+        self.dashboard.image_fiducials = False
+
+    def _handle_project_loaded(self, data):
+        self.dashboard.project_set = True
+
+    def _handle_close_project(self, data):
+        self.dashboard.project_set = False
+
+    def _handle_tracker_fiducials_set(self, data):
+        self.dashboard.tracker_fiducials = True
+
+    def _handle_reset_tracker_fiducials(self, data):
+        self.dashboard.tracker_fiducials = False
+
+    def _handle_robot_connection_status(self, data):
+        self.dashboard.robot_set = data['data'] == 'Connected'
+
+    def _handle_open_navigation_menu(self, data):
+        self.dashboard.matrix_set = True
+
+    def _handle_coil_at_target(self, data):
+        self.dashboard.at_target = data['state'] == True
+
+    def _handle_navigation_button(self, data):
+        self.dashboard.navigation_button_pressed = data["cond"]
+
+    def _handle_start_navigation(self, data):
+        self.dashboard.navigation_button_pressed = True
+
+    def _handle_stop_navigation(self, data):
+        self.dashboard.navigation_button_pressed = False
+
+    def _handle_free_drive(self, data):
+        self.dashboard.free_drive_robot_pressed = data["set"]
+
+    def _handle_move_away_button(self, data):
+        self.dashboard.move_upward_robot_pressed = data['pressed']
+
+    def _handle_robot_button(self, data):
+        self.dashboard.active_robot_pressed = data['pressed']
+
+    def _handle_robot_initial_config(self, data):
+        self.robot_state.sync_from_embedded(data['config'])
+
+    def _handle_fold_surface_task(self, data):
+        self._debounce_surface_request()
+
+    def _handle_tracker_update(self, data):
+        self._handle_tracker_poses(data)
+
+        if any(data['visibilities']):
+            self.dashboard.camera_set = True
+
+            self.dashboard.probe_visible = data['visibilities'][0]
+            self.dashboard.head_visible = data['visibilities'][1]
+            self.dashboard.coil_visible = data['visibilities'][2]
+
+        else:
+            self.dashboard.camera_set = False
+            self.dashboard.probe_visible = False
+            self.dashboard.head_visible = False
+            self.dashboard.coil_visible = False
+
+    def _handle_displacement_update(self, data):
+        self._handle_displacement(data)
+
+        self.dashboard.navigation_button_pressed = True
+        self.dashboard.target_set = True
+        self.dashboard.image_fiducials = True
+        self.dashboard.tracker_fiducials = True
+
+    def _handle_send_target(self, data):
+        self.dashboard.target_set = True
+
+        # Extract target position from transformation matrix
+        if 'target' in data:
+            target = np.array(data['target'])
+            self._handle_target_position(target)
+
+    def _handle_unset_target(self, data):
+        self.dashboard.target_set = False
+        self.dashboard.target_location = (0, 0, 0, 0, 0, 0)
+
+    def _handle_set_objective(self, data):
+        self.dashboard.robot_moving = False if data["objective"] == 0 else True
+
+        if not self.dashboard.robot_set and self.dashboard.robot_moving:
+            self.message_emit.check_robot_connection()
+
+    def _handle_force(self, data):
+        self.dashboard.force = data["force_feedback"]
+        if not self.dashboard.robot_set:
+            self.message_emit.check_robot_connection()
+
+    def _handle_pid_factors(self, data):
+        if 'pid_factors' in data:
+            self.robot_state._sync_pids(data['pid_factors'])
+
+    def _handle_surface_update(self, data):
+        self._handle_surface_stl(data)
+        self.dashboard.wait_for_stl = False
+
+    def _handle_remove_surfaces(self, data):
+        surface_indexes = data.get("surface_indexes", None)
+        if surface_indexes:
+            for index in surface_indexes:
+                self.dashboard.stl_urls.pop(index, None)
+
+    def _skip_conflated(self, topic: str, data):
+        """Drops a superseded pose message, keeping its displacement in the plotted history."""
+        self.conflated_counts[topic] += 1
+        if topic == DISPLACEMENT_TOPIC:
+            self.dashboard.add_displacement_sample(data['displacement'][:6])
+
+    def get_conflation_statistics(self) -> dict:
+        """Returns {topic: number of superseded messages skipped}."""
+        return dict(self.conflated_counts)
 
     def _debounce_surface_request(self):
         """Debounce surface requests to avoid overloading the socket."""
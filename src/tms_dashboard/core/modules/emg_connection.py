@@ -1,33 +1,77 @@
-import socket
+import heapq
+import itertools
 import struct
-import time
 import threading
+import time
 from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from tms_dashboard.constants import TriggerType, FrameType, SAMPLES_HEADER_SIZE
+from tms_dashboard.config import NEURONE_IP, NEURONE_PORT, NEURONE_BUFFER_SECONDS, NEURONE_RCVBUF_BYTES, NEURONE_QUEUE_SIZE, \
+    NEURONE_RECORDER_QUEUE_SIZE
+from tms_dashboard.core.modules.ring_buffer import SampleRingBuffer, has_lost_samples
+from tms_dashboard.core.modules.emg_filter import EMGFilterConfig, StreamingEMGFilter
+from tms_dashboard.core.modules.emg_receiver import NeurOneReceiver
+from tms_dashboard.core.modules.packet_queue import PacketQueue
+from tms_dashboard.core.modules.emg_recorder import EMGRecorder
+
+@dataclass
+class TriggeredWindows:
+    """Batch of triggered windows returned by neuroOne.get_windows_since()."""
+    trial_ids: np.ndarray       # (trials,) monotonically increasing sequence numbers
+    sample_indexes: np.ndarray  # (trials,) NeurOne sample index of each trigger
+    trigger_codes: np.ndarray   # (trials,) 8-bit trigger codes
+    windows: np.ndarray         # (trials, channels, samples)
+    cursor: int                 # Pass back to get_windows_since() to fetch the next batch
+    trigger_times: Optional[np.ndarray] = None  # (trials,) time.perf_counter() when each TRIGGER frame was parsed
+
+    def __len__(self):
+        return len(self.trial_ids)
 
-from tms_dashboard.constants import TriggerType, FrameType, JOIN_PORT, BUFFER_SIZE
-from tms_dashboard.config import NEURONE_IP, NEURONE_PORT
 
 class neuroOne:
-    def __init__(self, num_trial: int, t_min, t_max, ch: int, trigger_type_interest: TriggerType):
-        self.__sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.__sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.__sock.settimeout(0.1)  # Defined at 1.0s for a better responsivity
-        self.__last_join_time = 0
+    def __init__(self, num_trial: int, t_min, t_max, channels: Sequence[int], trigger_type_interest: TriggerType,
+                 filter_config: Optional[EMGFilterConfig] = None, host: str = NEURONE_IP, port: int = NEURONE_PORT,
+                 buffer_factory: Callable[[int, int], SampleRingBuffer] = SampleRingBuffer, recording_dir=None):
+        # Receive stage (asyncio thread) -> PacketQueue -> parse stage (parser thread)
+        self.__queue = PacketQueue(NEURONE_QUEUE_SIZE)
+        self.__receiver = NeurOneReceiver(host, port,
+                                          on_batch=self.__queue.push_many,
+                                          join_needed=lambda: not self.__status_meansurament,
+                                          rcvbuf_bytes=NEURONE_RCVBUF_BYTES)
+        self.__parser_thread = None
 
         self.__connected = False
         self.__status_meansurament = False
-        self.__buffer = deque(maxlen=100000)
+        self.__buffer = None  # SampleRingBuffer, allocated on MEASUREMENT_START
+        self.__buffer_factory = buffer_factory
         self.__lock = threading.Lock()
+        # Held by the parser for each batch and by reconfigure(), which makes reconfiguration atomic
+        self.__config_lock = threading.RLock()
         self.__running = False
-        self.__thread = None
-        self.__first_sample_idx = None
 
         self.__num_channels = 0
         self.__sampling_rate = 0
-        self.__pending_triggers = deque(maxlen=num_trial)
+        # Min-heap of (completion sample index, arrival order, trigger)
+        self.__pending_triggers = []
+        self.__trigger_order = itertools.count()
+        self.__num_trial = num_trial
+        self.__n_pre = 0
+        self.__n_post = 0
         self.__triggered_windows_data = deque(maxlen=num_trial)
-        self.__ch_index_in_bundle = 0
-        self.__scale_factor = 0.1
+        self.__last_trial_id = 0
+        self.__subscribers = []
+        self.__ch_indexes_in_bundle = []
+        self.__scale_factors = np.empty(0, dtype=np.float32)
+        self.__active_channels = []
+        self.__phys_ids = ()      # Channel layout of the current measurement, kept for reconfigure()
+        self.__type_bytes = b''
+        self.__filter_config = filter_config
+        self.__filter = None  # StreamingEMGFilter, designed on MEASUREMENT_START
+        self.__recorder = EMGRecorder(recording_dir, NEURONE_RECORDER_QUEUE_SIZE) if recording_dir is not None else None
         
         # UDP packets loss detection
         self.__last_seq_no = None
@@ -35,102 +79,95 @@ class neuroOne:
 
         self.t_min = t_min/1000
         self.t_max = t_max/1000
-        self.ch = ch
+        self.channels = tuple(channels)
         self.trigger_type_interest = trigger_type_interest
-
-        try:
-            self.__sock.bind(('', NEURONE_PORT))
-        except Exception as e:
-            print(f"Erro no Bind: {e}")
+        self.host = host
     
     def start(self):
         if not self.__running:
             self.__running = True
-            self.__thread = threading.Thread(target=self.__listen_loop, daemon=True)
-            self.__thread.start()
+            self.__parser_thread = threading.Thread(target=self.__parse_loop, daemon=True, name="NeurOne-Parser")
+            self.__parser_thread.start()
+            if self.__recorder is not None:
+                self.__recorder.start()
+            if not self.__receiver.start():
+                self.stop()
 
     def stop(self):
         self.__running = False
+        self.__receiver.stop()
+        self.__queue.wake()
+        if self.__parser_thread:
+            self.__parser_thread.join()
+            self.__parser_thread = None
+        if self.__recorder is not None:
+            self.__recorder.stop()
         self.__close_connection()
-        if self.__thread:
-            self.__thread.join()
 
-    def __listen_loop(self):
-        self.__try_connect()
+    def __parse_loop(self):
         while self.__running:
-            try:
-                data, addr = self.__sock.recvfrom(BUFFER_SIZE)
-                if data:
-                    frame_type = data[0]
-                    if not self.__connected:
-                        self.__connected = True
-                        print("Connected to NeuroOne!")
-                        continue
-                    self.__process_pack(frame_type, data)
-                    self.__update_triggered_window()
-
-            except socket.timeout:
-                if not self.__status_meansurament:
-                    self.__try_connect()
-                continue
-                
-            except Exception as e:
-                time.sleep(1)
-            
+            datagrams = self.__queue.pop_all()
+            if datagrams:
+                self.__process_batch(datagrams)
+            else:
+                self.__queue.wait(timeout=0.5)
+
+    def __process_batch(self, datagrams):
+        """Parses a batch of datagrams, then extracts the windows they completed."""
+        if not self.__connected:
+            self.__connected = True
+            print("Connected to NeuroOne!")
+
+        with self.__config_lock:
+            for data in datagrams:
+                try:
+                    self.__process_pack(data[0], data)
+                except Exception as e:
+                    print(f"Error parsing NeuroOne packet (type {data[0]}): {e}")
+            self.__update_triggered_window()
+
+    def feed(self, datagrams):
+        """Parses datagrams in the caller's thread as if they had been received.
+
+        Used to replay recorded sessions without a socket; do not call it while
+        the driver is started. Windows are delivered to subscribers.
+
+        Args:
+            datagrams: Sequence of raw NeurOne frames (bytes)
+        """
+        self.__process_batch(datagrams)
+
     def get_connection(self):
         return self.__connected
 
     def get_status(self):
         return self.__status_meansurament
     
-    def __try_connect(self):
-        current_time = time.time()
-        if current_time - self.__last_join_time > 1.0:
-            self.__send_join_packet()
-            self.__last_join_time = current_time
-
-    def __send_join_packet(self):
-        """ Sends JOIN packet to unlock hardware streaming """
-        join_packet = struct.pack('>B3x', FrameType.JOIN) # Type 128 + 3 bytes padding
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.sendto(join_packet, (NEURONE_IP, JOIN_PORT))
-        except Exception as e:
-            print(f"Error while sending JOIN packet: {e}")
-        
     def __process_pack(self, frame_type, data):
         if frame_type == FrameType.MEASUREMENT_START:
             self.__sampling_rate = struct.unpack('>I', data[4:8])[0]
             self.__num_channels = struct.unpack('>H', data[16:18])[0]
             self.__status_meansurament = True
+            self.__last_seq_no = None
+            self.__n_pre = int(abs(self.t_min) * self.__sampling_rate)
+            self.__n_post = int(self.t_max * self.__sampling_rate)
 
             offset = 18
-            found_idx = None
-            for i in range(self.__num_channels):
-                phys_id = struct.unpack('>H', data[offset:offset+2])[0]
-                if phys_id == self.ch:
-                    found_idx = i
-                offset += 2
-
-            if found_idx is not None:
-                type_byte = data[offset + found_idx]
-                is_dc = (type_byte & 0x07) == 1
-                is_tesla = ((type_byte >> 3) & 0x03) == 1
-                if is_tesla:
-                    if is_dc:
-                        # Tesla DC: ~51 nV/bit
-                        self.__scale_factor = 0.05125
-                    else:
-                        # Tesla AC: ~10.25 nV/bit
-                        self.__scale_factor = 0.01025 * 2
-                else:
-                    # NeuroOne: ~100 nV/bit
-                    divider = 100.0 if is_dc else 1.0
-                    self.__scale_factor = 0.1 / divider
+            self.__phys_ids = struct.unpack(f'>{self.__num_channels}H', data[offset:offset + 2 * self.__num_channels])
+            offset += 2 * self.__num_channels
+            self.__type_bytes = bytes(data[offset:offset + self.__num_channels])
 
+            found_idx, found_channels, scale_factors = self.__resolve_channels()
+            if found_idx:
                 with self.__lock:
-                    self.__ch_index_in_bundle = found_idx
-                    self.__buffer = deque(maxlen=self.__sampling_rate * 3000)
+                    self.__ch_indexes_in_bundle = found_idx
+                    self.__active_channels = found_channels
+                    self.__scale_factors = np.array(scale_factors, dtype=np.float32)
+                    self.__buffer = self.__buffer_factory(int(self.__sampling_rate * NEURONE_BUFFER_SECONDS), len(found_idx))
+                    if self.__filter_config is not None:
+                        self.__filter = StreamingEMGFilter(self.__filter_config, self.__sampling_rate)
+                if self.__recorder is not None:
+                    self.__recorder.begin(self.__sampling_rate, found_channels, scale_factors)
 
         elif frame_type == FrameType.SAMPLES:
             if self.__num_channels == 0: return
@@ -138,32 +175,31 @@ class neuroOne:
             sample_idx = struct.unpack('>Q', data[12:20])[0]
             num_bundles = struct.unpack('>H', data[10:12])[0]
             
-            with self.__lock:
-                if self.__last_seq_no is not None:
-                    expected = (self.__last_seq_no + 1) % (2**32)
-                    if seq_no != expected:
-                        lost = (seq_no - expected) % (2**32)
-                        self.__packets_lost += lost
-                        print(f"{lost} UDP packet(s) lost! Accrued total: {self.__packets_lost}")
-                
-                self.__last_seq_no = seq_no
+            # Sequence tracking is only touched by the parser thread, no lock needed
+            if self.__last_seq_no is not None:
+                expected = (self.__last_seq_no + 1) % (2**32)
+                if seq_no != expected:
+                    lost = (seq_no - expected) % (2**32)
+                    self.__packets_lost += lost
+                    print(f"{lost} UDP packet(s) lost! Accrued total: {self.__packets_lost}")
+                    if self.__filter is not None:
+                        # The filter state does not carry across the missing samples
+                        self.__filter.reset()
+            
+            self.__last_seq_no = seq_no
             
-            offset = 28
-            bytes_per_bundle = self.__num_channels * 3
-            target_offset_in_bundle = self.__ch_index_in_bundle * 3
+            # Decodes the whole bundle payload at once, outside the lock
+            block = decode_samples(data, num_bundles, self.__num_channels, self.__ch_indexes_in_bundle)
+            values_uV = block * self.__scale_factors
+            if self.__recorder is not None:
+                # Recorded unfiltered so the filter can be changed offline
+                self.__recorder.write_samples(sample_idx, values_uV)
+            if self.__filter is not None:
+                values_uV = self.__filter.process(values_uV)
 
             with self.__lock:
-                if self.__first_sample_idx is None:
-                    self.__first_sample_idx = sample_idx
-                
-                for b in range(num_bundles):
-                    pos = offset + (b * bytes_per_bundle) + target_offset_in_bundle
-                    sample_raw = data[pos : pos + 3]
-                    val_uV = int24_to_int32(sample_raw) * self.__scale_factor
-                    self.__buffer.append(val_uV)
-                    
-                    if len(self.__buffer) == self.__buffer.maxlen:
-                        self.__first_sample_idx += 1
+                if self.__buffer is not None:
+                    self.__buffer.write(sample_idx, values_uV)
 
             
         elif frame_type == FrameType.MEASUREMENT_END:
@@ -171,6 +207,8 @@ class neuroOne:
             self.__num_channels = 0
             self.__sampling_rate = 0
             self.__connected = False
+            if self.__recorder is not None:
+                self.__recorder.end()
             print("Disconnected from NeuroOne")
         
         elif frame_type == FrameType.TRIGGER:
@@ -185,51 +223,240 @@ class neuroOne:
                 # Types extraction
                 source_id = (type_byte >> 4) & 0x0F
                 mode      = type_byte & 0x0F
+                if self.__recorder is not None:
+                    self.__recorder.write_trigger(sample_idx, trigger_code, mode)
                 if mode == self.trigger_type_interest.value:
-                    with self.__lock:
-                        self.__pending_triggers.append({
-                            'idx': sample_idx,
-                            'code': trigger_code,
-                        })
-                        print(f"Trigger detected: {TriggerType(mode).name} (Code: {trigger_code}) in sample {sample_idx}")
+                    # Pending triggers are only touched by the parser thread
+                    heapq.heappush(self.__pending_triggers, (sample_idx + self.__n_post, next(self.__trigger_order), {
+                        'idx': sample_idx,
+                        'code': trigger_code,
+                        'received_at': time.perf_counter(),
+                    }))
+                    if len(self.__pending_triggers) > self.__num_trial:
+                        heapq.heappop(self.__pending_triggers)
+                    print(f"Trigger detected: {TriggerType(mode).name} (Code: {trigger_code}) in sample {sample_idx}")
 
                 offset += 20
     
+    def __resolve_channels(self):
+        """Positions in the bundle, found channel ids and scale factors of self.channels."""
+        found_idx, found_channels, scale_factors = [], [], []
+        for ch in self.channels:
+            if ch not in self.__phys_ids:
+                print(f"Channel {ch} not found in NeuroOne measurement")
+                continue
+            idx = self.__phys_ids.index(ch)
+            found_idx.append(idx)
+            found_channels.append(ch)
+            scale_factors.append(channel_scale_factor(self.__type_bytes[idx]))
+        return found_idx, found_channels, scale_factors
+
+    def reconfigure(self, t_min=None, t_max=None, channels: Optional[Sequence[int]] = None, num_trial: Optional[int] = None):
+        """Changes the window bounds, channel selection or history length while acquiring.
+
+        The socket stays open and the change is atomic with respect to packet
+        parsing. Retained trials are re-extracted from the ring buffer with the
+        new settings in one vectorized pass; those no longer in the buffer are
+        dropped. Samples of newly selected channels are only available from
+        now on, while removing channels keeps the buffered data of the others.
+
+        Args:
+            t_min: Window start relative to the trigger in ms (None keeps it)
+            t_max: Window end relative to the trigger in ms (None keeps it)
+            channels: Physical channel ids to acquire (None keeps them)
+            num_trial: Number of trials retained by the driver (None keeps it)
+        """
+        with self.__config_lock:
+            if t_min is not None:
+                self.t_min = t_min/1000
+            if t_max is not None:
+                self.t_max = t_max/1000
+            if num_trial is not None:
+                self.__num_trial = num_trial
+            if channels is not None:
+                self.channels = tuple(channels)
+                if self.__status_meansurament and self.__phys_ids:
+                    self.__select_channels()
+
+            self.__n_pre = int(abs(self.t_min) * self.__sampling_rate)
+            self.__n_post = int(self.t_max * self.__sampling_rate)
+            self.__pending_triggers = [(trig['idx'] + self.__n_post, order, trig)
+                                       for _, order, trig in self.__pending_triggers]
+            heapq.heapify(self.__pending_triggers)
+
+            with self.__lock:
+                trials = list(self.__triggered_windows_data)
+                self.__triggered_windows_data = deque(maxlen=self.__num_trial)
+                if trials:
+                    windows, valid = self.__extract_windows([trial['idx'] for trial in trials])
+                    for trial, window, ok in zip(trials, windows, valid):
+                        if ok:
+                            self.__triggered_windows_data.append(dict(trial, window=window))
+        print(f"NeuroOne window reconfigured: {self.t_min*1000:g} to {self.t_max*1000:g} ms, channels {list(self.channels)}")
+
+    def __select_channels(self):
+        """Switches the acquired channels, keeping the buffered data of those still selected."""
+        found_idx, found_channels, scale_factors = self.__resolve_channels()
+        with self.__lock:
+            old_buffer, old_channels = self.__buffer, self.__active_channels
+            kept = None
+            if old_buffer is not None and old_buffer.end_idx is not None and set(found_channels) <= set(old_channels):
+                columns = [old_channels.index(ch) for ch in found_channels]
+                # Copied before the new buffer is created: both may share the same storage
+                kept = (old_buffer.first_idx, old_buffer.read(old_buffer.first_idx, old_buffer.end_idx)[:, columns])
+
+            self.__ch_indexes_in_bundle = found_idx
+            self.__active_channels = found_channels
+            self.__scale_factors = np.array(scale_factors, dtype=np.float32)
+            self.__buffer = None
+            if found_idx:
+                self.__buffer = self.__buffer_factory(int(self.__sampling_rate * NEURONE_BUFFER_SECONDS), len(found_idx))
+                if kept is not None:
+                    self.__buffer.write(*kept)
+            if self.__filter_config is not None:
+                self.__filter = StreamingEMGFilter(self.__filter_config, self.__sampling_rate)
+        if self.__recorder is not None and found_idx:
+            self.__recorder.begin(self.__sampling_rate, found_channels, scale_factors)
+
+    def extract_windows(self, sample_indexes):
+        """Extracts the current window around arbitrary trigger samples from the ring buffer.
+
+        Args:
+            sample_indexes: (trials,) NeurOne sample index of each trigger
+
+        Returns:
+            (windows, valid): windows shaped (trials, channels, samples) and a
+            (trials,) bool mask of the triggers whose window is still buffered
+        """
+        with self.__lock:
+            return self.__extract_windows(sample_indexes)
+
+    def __extract_windows(self, sample_indexes):
+        sample_indexes = np.asarray(sample_indexes, dtype=np.int64)
+        if self.__buffer is None:
+            return (np.empty((len(sample_indexes), len(self.__active_channels), 0), dtype=np.float32),
+                    np.zeros(len(sample_indexes), dtype=bool))
+        windows, valid = self.__buffer.read_windows(sample_indexes - self.__n_pre, self.__n_pre + self.__n_post)
+        return windows.transpose(0, 2, 1), valid
+
     def __update_triggered_window(self):
+        """Extracts the windows whose last sample has arrived and notifies subscribers.
+
+        Pending triggers are ordered by the sample index at which their window
+        completes, so when nothing is ready this is a single comparison.
+        """
+        buffer = self.__buffer
+        if not self.__pending_triggers or buffer is None or buffer.end_idx is None:
+            return
+        if self.__pending_triggers[0][0] > buffer.end_idx:
+            return
+
+        new_trials = []
         with self.__lock:
-            if self.__first_sample_idx is None: return
-            
-            n_pre = int(abs(self.t_min) * self.__sampling_rate)
-            n_post = int(self.t_max * self.__sampling_rate)
-            last_idx = self.__first_sample_idx + len(self.__buffer) - 1
+            while self.__pending_triggers and self.__pending_triggers[0][0] <= buffer.end_idx:
+                _, _, trig = heapq.heappop(self.__pending_triggers)
+                window = buffer.read(trig['idx'] - self.__n_pre, trig['idx'] + self.__n_post)
+                # Windows older than the buffer can never be extracted
+                if window is None:
+                    continue
+                if has_lost_samples(window[None])[0]:
+                    print(f"Trigger in sample {trig['idx']} skipped: its window overlaps lost packets")
+                    continue
+                self.__last_trial_id += 1
+                trial = {
+                    'id': self.__last_trial_id,
+                    'idx': trig['idx'],
+                    'code': trig['code'],
+                    'received_at': trig['received_at'],
+                    'window': window.T,
+                }
+                self.__triggered_windows_data.append(trial)
+                new_trials.append(trial)
 
-            # Process triggers and mark which ones to remove
-            triggers_to_remove = []
-            
-            for trig in self.__pending_triggers:
-                end_sample = trig['idx'] + n_post
-                if last_idx >= end_sample:
-                    start_pos = (trig['idx'] - n_pre) - self.__first_sample_idx
-                    end_pos = (trig['idx'] + n_post) - self.__first_sample_idx
-                    
-                    if start_pos >= 0:
-                        window = list(self.__buffer)[start_pos:end_pos]
-                        self.__triggered_windows_data.append(window)
-                        triggers_to_remove.append(trig)
-            
-            # Remove processed triggers
-            for trig in triggers_to_remove:
-                self.__pending_triggers.remove(trig)
+        if new_trials and self.__subscribers:
+            batch = self.__make_batch(new_trials, new_trials[-1]['id'])
+            for callback in list(self.__subscribers):
+                try:
+                    callback(batch)
+                except Exception as e:
+                    print(f"Error in triggered window subscriber: {e}")
+
+    def subscribe(self, callback: Callable[[TriggeredWindows], None]):
+        """Registers a callback receiving each batch of new windows as soon as it completes.
+
+        The callback runs on the parser thread and must return quickly; pass
+        a queue's put method to hand windows over to another thread.
+        """
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.__subscribers:
+            self.__subscribers.remove(callback)
     
     def get_triggered_window(self):
-        """Returns thread-safe cpy of captured windows."""
+        """Returns thread-safe copy of captured windows.
+
+        Returns:
+            Array shaped (trials, channels, samples), empty if nothing was captured
+        """
         if self.__connected and self.__status_meansurament and self.__running:
             with self.__lock:
-                return list(self.__triggered_windows_data)
-        return []
+                if self.__triggered_windows_data:
+                    return np.stack([trial['window'] for trial in self.__triggered_windows_data])
+        return np.empty((0, len(self.channels), 0), dtype=np.float32)
+
+    def get_windows_since(self, cursor: int = 0) -> TriggeredWindows:
+        """Returns only the windows captured after a cursor.
+
+        Cost depends on the number of new trials, not on the retained history.
+        Trials that already left the num_trial history are not returned.
+
+        Args:
+            cursor: Value of TriggeredWindows.cursor from the previous call (0 for all)
+
+        Returns:
+            TriggeredWindows with the new trials, oldest first
+        """
+        new_trials = []
+        if self.__connected and self.__status_meansurament and self.__running:
+            with self.__lock:
+                for trial in reversed(self.__triggered_windows_data):
+                    if trial['id'] <= cursor:
+                        break
+                    new_trials.append(trial)
+        new_trials.reverse()
+        return self.__make_batch(new_trials, cursor)
+
+    def __make_batch(self, trials, cursor):
+        if not trials:
+            return TriggeredWindows(
+                trial_ids=np.empty(0, dtype=np.int64),
+                sample_indexes=np.empty(0, dtype=np.int64),
+                trigger_codes=np.empty(0, dtype=np.uint8),
+                windows=np.empty((0, len(self.channels), 0), dtype=np.float32),
+                cursor=cursor,
+                trigger_times=np.empty(0, dtype=np.float64),
+            )
+
+        return TriggeredWindows(
+            trial_ids=np.array([trial['id'] for trial in trials], dtype=np.int64),
+            sample_indexes=np.array([trial['idx'] for trial in trials], dtype=np.int64),
+            trigger_codes=np.array([trial['code'] for trial in trials], dtype=np.uint8),
+            windows=np.stack([trial['window'] for trial in trials]),
+            cursor=trials[-1]['id'],
+            trigger_times=np.array([trial['received_at'] for trial in trials], dtype=np.float64),
+        )
     
     def get_sampling_rate(self):
         return self.__sampling_rate
+
+    def get_channels(self):
+        """Physical channels found in the current measurement, in window order."""
+        return list(self.__active_channels)
+
+    def get_scale_factors(self):
+        """uV/bit factors of the channels returned by get_channels(), in the same order."""
+        return self.__scale_factors.tolist()
     
     def get_statistics(self):
         """Returns connection stats for debugging."""
@@ -238,19 +465,30 @@ class neuroOne:
                 'packets_lost': self.__packets_lost,
                 'pending_triggers': len(self.__pending_triggers),
                 'captured_windows': len(self.__triggered_windows_data),
-                'buffer_size': len(self.__buffer),
-                'sampling_rate': self.__sampling_rate
+                'last_trial_id': self.__last_trial_id,
+                'buffer_size': len(self.__buffer) if self.__buffer is not None else 0,
+                'buffer_bytes': self.__buffer.nbytes if self.__buffer is not None else 0,
+                'sampling_rate': self.__sampling_rate,
+                'channels': list(self.__active_channels),
+                'datagrams_received': self.__receiver.datagrams_received,
+                'receive_batches': self.__receiver.batches_received,
+                'max_receive_batch': self.__receiver.max_batch_seen,
+                'socket_rcvbuf_bytes': self.__receiver.rcvbuf_bytes,
+                'queue_depth': len(self.__queue),
+                'queue_capacity': self.__queue.capacity,
+                'queue_high_water': self.__queue.high_water,
+                'queue_dropped': self.__queue.dropped,
+                'recorded_samples': self.__recorder.recorded_samples if self.__recorder is not None else 0,
+                'recorder_dropped': self.__recorder.dropped_blocks if self.__recorder is not None else 0,
             }
         
     def get_pick2pick(self):
         if self.__connected and self.__status_meansurament and self.__running:
             with self.__lock:
-                list(self.__triggered_windows_data)
-                return list(self.__triggered_windows_data)
+                return [trial['window'] for trial in self.__triggered_windows_data]
         return []
     
     def __close_connection(self):
-        self.__sock.close()
         if self.__connected:
             self.__connected = False
             print("Disconnected from NeuroOne")
@@ -270,11 +508,53 @@ def int24_to_int32(data_bytes):
         return combined >> 8
 
 
+def channel_scale_factor(type_byte):
+    """Returns the uV/bit factor for a channel from its MEASUREMENT_START type byte."""
+    is_dc = (type_byte & 0x07) == 1
+    is_tesla = ((type_byte >> 3) & 0x03) == 1
+    if is_tesla:
+        if is_dc:
+            # Tesla DC: ~51 nV/bit
+            return 0.05125
+        # Tesla AC: ~10.25 nV/bit
+        return 0.01025 * 2
+    # NeuroOne: ~100 nV/bit
+    divider = 100.0 if is_dc else 1.0
+    return 0.1 / divider
+
+
+def decode_samples(data, num_bundles, num_channels, channel_indexes=None, offset=SAMPLES_HEADER_SIZE):
+    """
+    Decodes the int24 big-endian payload of a SAMPLES frame in one pass.
+
+    Each 3-byte sample is copied into the upper bytes of a 4-byte slot, viewed as
+    big-endian int32 and arithmetically shifted right by 8, which sign-extends it
+    exactly like int24_to_int32.
+
+    Args:
+        data: Raw SAMPLES frame (bytes-like)
+        num_bundles: Number of sample bundles in the frame
+        num_channels: Number of channels in each bundle
+        channel_indexes: Positions in the bundle to decode (all channels if None)
+        offset: Byte offset of the first bundle in the frame
+
+    Returns:
+        int32 array shaped (num_bundles, len(channel_indexes))
+    """
+    raw = np.frombuffer(data, dtype=np.uint8, count=num_bundles * num_channels * 3, offset=offset)
+    raw = raw.reshape(num_bundles, num_channels, 3)
+    if channel_indexes is not None:
+        raw = raw[:, channel_indexes, :]
+
+    padded = np.zeros(raw.shape[:2] + (4,), dtype=np.uint8)
+    padded[..., :3] = raw
+    return (padded.view('>i4')[..., 0] >> 8).astype(np.int32)
+
+
 if __name__ == '__main__':
     import matplotlib.pyplot as plt
-    import numpy as np
 
-    device = neuroOne(10, -0.01, 0.04, 33, TriggerType.STIMULUS)
+    device = neuroOne(10, -0.01, 0.04, [33], TriggerType.STIMULUS)
     device.start()
 
     plt.ion()
@@ -288,14 +568,14 @@ if __name__ == '__main__':
                 ax.clear()
                 # Cria o eixo do tempo baseado na janela definida
                 # O ponto 0 será exatamente o trigger
-                time_axis = np.linspace(device.t_min, device.t_max, len(windows[0]))
+                time_axis = np.linspace(device.t_min, device.t_max, windows.shape[-1])
                 
-                for i, win in enumerate(windows):
+                for i, win in enumerate(windows[:, 0]):
                     alpha = 0.3 if i < len(windows)-1 else 1.0 # Destaque para a última
                     ax.plot(time_axis, win, alpha=alpha, label=f"Trial {i+1}" if i == len(windows)-1 else "")
                 
                 ax.axvline(0, color='red', linestyle='--', label='Trigger')
-                ax.set_title(f"Janelas Capturadas (Total: {len(windows)}) - Canal {device.ch}")
+                ax.set_title(f"Janelas Capturadas (Total: {len(windows)}) - Canal {device.channels[0]}")
                 ax.set_xlabel("Tempo (s)")
                 ax.set_ylabel("Amplitude (uV)")
                 ax.grid(True)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Streaming IIR filter stage for the EMG ingest path"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from scipy import signal
+
+from tms_dashboard.config import NEURONE_NOTCH_HZ, NEURONE_BANDPASS_HZ
+
+
+@dataclass
+class EMGFilterConfig:
+    """Filter settings; set a stage to None to disable it."""
+    notch_hz: Optional[float] = NEURONE_NOTCH_HZ
+    notch_q: float = 30.0
+    highpass_hz: Optional[float] = NEURONE_BANDPASS_HZ[0]
+    lowpass_hz: Optional[float] = NEURONE_BANDPASS_HZ[1]
+    order: int = 2
+
+
+class StreamingEMGFilter:
+    """Notch + band-pass filter applied packet by packet with carried-over state.
+
+    All stages are cascaded into a single set of second-order sections and the
+    filter state (zi) is kept between calls, so each block is filtered exactly
+    as if the whole stream had been filtered at once. Cost per packet depends
+    only on the block size, never on the session length.
+    """
+
+    def __init__(self, config: EMGFilterConfig, sampling_rate: float):
+        """Designs the filter for a measurement.
+
+        Args:
+            config: Filter settings
+            sampling_rate: Sampling rate in Hz
+        """
+        nyquist = sampling_rate / 2
+        sections = []
+
+        if config.notch_hz is not None and config.notch_hz < nyquist:
+            b, a = signal.iirnotch(config.notch_hz, config.notch_q, fs=sampling_rate)
+            sections.append(signal.tf2sos(b, a))
+
+        # Cutoffs at or above Nyquist cannot be realised, so the stage is dropped
+        highpass = config.highpass_hz
+        lowpass = config.lowpass_hz if config.lowpass_hz is not None and config.lowpass_hz < 0.95 * nyquist else None
+        if highpass is not None and lowpass is not None:
+            sections.append(signal.butter(config.order, [highpass, lowpass], btype='bandpass', fs=sampling_rate, output='sos'))
+        elif highpass is not None:
+            sections.append(signal.butter(config.order, highpass, btype='highpass', fs=sampling_rate, output='sos'))
+        elif lowpass is not None:
+            sections.append(signal.butter(config.order, lowpass, btype='lowpass', fs=sampling_rate, output='sos'))
+
+        self.__sos = np.vstack(sections) if sections else None
+        self.__zi = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.__sos is not None
+
+    def reset(self):
+        """Forgets the filter state (e.g. after a discontinuity)."""
+        self.__zi = None
+
+    def process(self, block):
+        """Filters a block of consecutive samples.
+
+        Args:
+            block: Array shaped (n_samples, num_channels)
+
+        Returns:
+            Filtered block as float32, same shape
+        """
+        if self.__sos is None or len(block) == 0:
+            return block
+
+        if self.__zi is None:
+            # Steady-state initial conditions for the first sample avoid a DC step transient
+            zi = signal.sosfilt_zi(self.__sos)
+            self.__zi = zi[:, :, None] * np.asarray(block[0], dtype=np.float64)[None, None, :]
+
+        filtered, self.__zi = signal.sosfilt(self.__sos, block, axis=0, zi=self.__zi)
+        return filtered.astype(np.float32)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""asyncio UDP receiver for the NeurOne Real-time Out stream"""
+
+import asyncio
+import socket
+import struct
+import threading
+from typing import Callable, List, Optional
+
+from tms_dashboard.constants import FrameType, JOIN_PORT, BUFFER_SIZE
+
+
+class _NeurOneProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver: 'NeurOneReceiver'):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        self.receiver._on_datagram(data)
+
+    def error_received(self, exc):
+        print(f"NeurOne receiver socket error: {exc}")
+
+
+class NeurOneReceiver:
+    """Receives NeurOne datagrams on a dedicated asyncio loop/thread.
+
+    When the socket becomes readable, every datagram already queued in the
+    kernel is drained and handed to the parser as one batch, so a burst costs
+    a single wakeup. A large SO_RCVBUF absorbs bursts while the parser is
+    busy. JOIN packets are re-sent from a timer while `join_needed()` is true,
+    independently of the traffic.
+    """
+
+    def __init__(self, host: str, port: int, on_batch: Callable[[List[bytes]], None],
+                 join_needed: Callable[[], bool], rcvbuf_bytes: int, join_interval: float = 1.0,
+                 max_batch: int = 256):
+        """Initializes the receiver (nothing is bound until start()).
+
+        Args:
+            host: NeurOne address JOIN packets are sent to
+            port: Local UDP port the stream is received on
+            on_batch: Called on the receiver thread with a list of raw datagrams
+            join_needed: Polled by the JOIN timer; JOIN is sent while it returns True
+            rcvbuf_bytes: Requested kernel receive buffer size
+            join_interval: Seconds between JOIN attempts
+            max_batch: Maximum datagrams handed over in one batch
+        """
+        self.host = host
+        self.port = port
+        self.__on_batch = on_batch
+        self.__join_needed = join_needed
+        self.__rcvbuf_bytes = rcvbuf_bytes
+        self.__join_interval = join_interval
+        self.__max_batch = max_batch
+
+        self.__sock: Optional[socket.socket] = None
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__transport = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__started = threading.Event()
+
+        self.datagrams_received = 0
+        self.batches_received = 0
+        self.max_batch_seen = 0
+        self.rcvbuf_bytes = 0
+
+    def start(self) -> bool:
+        """Binds the socket and starts the receiver thread.
+
+        Returns:
+            False if the socket could not be bound
+        """
+        if self.__thread is not None and self.__thread.is_alive():
+            return True
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.__rcvbuf_bytes)
+        try:
+            sock.bind(('', self.port))
+        except OSError as e:
+            print(f"Erro no Bind: {e}")
+            sock.close()
+            return False
+        sock.setblocking(False)
+        self.rcvbuf_bytes = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        self.__sock = sock
+
+        self.__started.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True, name="NeurOne-Receiver")
+        self.__thread.start()
+        self.__started.wait(timeout=5)
+        return True
+
+    def stop(self):
+        if self.__loop is not None and self.__loop.is_running():
+            self.__loop.call_soon_threadsafe(self.__loop.stop)
+        if self.__thread is not None:
+            self.__thread.join(timeout=5)
+            self.__thread = None
+
+    def __run(self):
+        self.__loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.__loop)
+        try:
+            self.__transport, _ = self.__loop.run_until_complete(
+                self.__loop.create_datagram_endpoint(lambda: _NeurOneProtocol(self), sock=self.__sock))
+            self.__loop.call_soon(self.__join_tick)
+            self.__started.set()
+            self.__loop.run_forever()
+        finally:
+            if self.__transport is not None:
+                self.__transport.close()
+                self.__transport = None
+            self.__loop.run_until_complete(self.__loop.shutdown_asyncgens())
+            self.__loop.close()
+            self.__started.set()
+
+    def __join_tick(self):
+        if self.__join_needed():
+            self.send_join()
+        self.__loop.call_later(self.__join_interval, self.__join_tick)
+
+    def send_join(self):
+        """Sends JOIN packet to unlock hardware streaming."""
+        join_packet = struct.pack('>B3x', FrameType.JOIN)  # Type 128 + 3 bytes padding
+        try:
+            self.__transport.sendto(join_packet, (self.host, JOIN_PORT))
+        except Exception as e:
+            print(f"Error while sending JOIN packet: {e}")
+
+    def _on_datagram(self, data: bytes):
+        # Drains whatever else is already waiting so the parser gets the burst at once
+        batch = [data]
+        while len(batch) < self.__max_batch:
+            try:
+                batch.append(self.__sock.recv(BUFFER_SIZE))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                print(f"NeurOne receiver socket error: {e}")
+                break
+
+        self.datagrams_received += len(batch)
+        self.batches_received += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+        try:
+            self.__on_batch(batch)
+        except Exception as e:
+            print(f"Error processing NeurOne packets: {e}")
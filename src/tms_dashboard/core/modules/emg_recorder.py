@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Raw EMG session recording to memory-mapped files"""
+
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+RECORDING_DTYPE = np.float32
+TRIGGER_COLUMNS = 'sample_idx,code,mode,wall_time'
+
+
+class EMGRecorder:
+    """Appends decoded EMG samples and triggers of each measurement to disk.
+
+    Every NeurOne measurement becomes one recording made of three files
+    sharing a stem:
+
+    * ``<stem>.f32``: raw (samples, channels) float32 in uV, row i holding
+      absolute sample first_sample_idx + i. Grows in chunks of
+      chunk_seconds; gaps left by lost packets read as zeros.
+    * ``<stem>.json``: sampling rate, channel map, scale factors and length.
+    * ``<stem>_triggers.csv``: sample index, code, mode and wall-clock time.
+
+    The parser thread only enqueues references; a background thread does
+    the file I/O. When queue_size sample blocks are already waiting, new
+    sample blocks are dropped (and counted in the header as
+    ``dropped_samples``) instead of blocking ingest. Begin, end and trigger
+    items are never dropped, so measurements cannot be spliced together.
+    """
+
+    def __init__(self, directory, queue_size: int = 1024, chunk_seconds: float = 60.0):
+        """Initializes the recorder.
+
+        Args:
+            directory: Folder receiving the recordings (created if missing)
+            queue_size: Maximum number of sample blocks waiting to be written
+            chunk_seconds: Seconds of samples preallocated each time the file grows
+        """
+        self.directory = Path(directory)
+        self.chunk_seconds = chunk_seconds
+        # Unbounded so control items always fit; sample blocks are bounded by the pending count
+        self.__queue = queue.Queue()
+        self.__queue_size = queue_size
+        self.__pending_blocks = 0
+        self.__generation = 0       # Recording counter of the producer side, bumped by begin()
+        self.__dropped_by_generation = {}
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+        # Writer thread state
+        self.__header = None
+        self.__stem = None
+        self.__raw_file = None
+        self.__mmap = None
+        self.__trigger_file = None
+        self.__writer_generation = 0
+
+        self.recorded_samples = 0
+        self.dropped_blocks = 0
+        self.dropped_samples = 0
+        self.current_path: Optional[Path] = None
+
+    def start(self):
+        if self.__thread is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.__thread = threading.Thread(target=self.__write_loop, daemon=True, name="EMG-Recorder")
+            self.__thread.start()
+
+    def stop(self):
+        """Flushes pending data, closes the current recording and stops the thread."""
+        if self.__thread is not None:
+            self.__queue.put(('stop',))
+            self.__thread.join()
+            self.__thread = None
+
+    def begin(self, sampling_rate: int, channels: Sequence[int], scale_factors):
+        """Starts a new recording (called on MEASUREMENT_START)."""
+        with self.__lock:
+            self.__generation += 1
+            generation = self.__generation
+        self.__queue.put(('begin', generation, int(sampling_rate), list(channels), np.asarray(scale_factors).tolist()))
+
+    def end(self):
+        """Closes the current recording (called on MEASUREMENT_END)."""
+        self.__queue.put(('end',))
+
+    def write_samples(self, sample_idx: int, block):
+        """Queues a (n_samples, channels) block; the array must not be modified afterwards."""
+        with self.__lock:
+            if self.__pending_blocks >= self.__queue_size:
+                self.dropped_blocks += 1
+                self.dropped_samples += len(block)
+                dropped = self.__dropped_by_generation
+                dropped[self.__generation] = dropped.get(self.__generation, 0) + len(block)
+                return
+            self.__pending_blocks += 1
+        self.__queue.put(('samples', sample_idx, block))
+
+    def write_trigger(self, sample_idx: int, code: int, mode: int):
+        self.__queue.put(('trigger', sample_idx, code, mode, time.time()))
+
+    def __write_loop(self):
+        while True:
+            item = self.__queue.get()
+            try:
+                if item[0] == 'samples':
+                    with self.__lock:
+                        self.__pending_blocks -= 1
+                    self.__write_samples(item[1], item[2])
+                elif item[0] == 'trigger':
+                    self.__write_trigger(*item[1:])
+                elif item[0] == 'begin':
+                    self.__close_recording()
+                    self.__writer_generation = item[1]
+                    self.__open_recording(*item[2:])
+                elif item[0] == 'end':
+                    self.__close_recording()
+                elif item[0] == 'stop':
+                    self.__close_recording()
+                    return
+            except Exception as e:
+                print(f"Error writing EMG recording: {e}")
+
+    def __open_recording(self, sampling_rate, channels, scale_factors):
+        self.__stem = self.directory / f"emg_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        self.__header = {
+            'sampling_rate': sampling_rate,
+            'channels': channels,
+            'scale_factors': scale_factors,
+            'units': 'uV',
+            'dtype': np.dtype(RECORDING_DTYPE).str,
+            'first_sample_idx': None,
+            'num_samples': 0,
+            'dropped_samples': 0,  # Rows left as zeros because the write queue was full
+            'start_time': time.time(),
+        }
+        self.__raw_file = open(self.__stem.with_suffix('.f32'), 'w+b')
+        self.__mmap = None
+        self.__trigger_file = open(f"{self.__stem}_triggers.csv", 'w')
+        self.__trigger_file.write(TRIGGER_COLUMNS + '\n')
+        self.__write_header()
+        self.current_path = self.__stem
+        print(f"Recording EMG to {self.__stem}")
+
+    def __close_recording(self):
+        if self.__header is None:
+            return
+        self.__mmap = None  # Unmaps before truncating
+        row_bytes = len(self.__header['channels']) * np.dtype(RECORDING_DTYPE).itemsize
+        self.__raw_file.truncate(self.__header['num_samples'] * row_bytes)
+        self.__raw_file.close()
+        self.__trigger_file.close()
+        self.__write_header()
+        with self.__lock:
+            self.__dropped_by_generation.pop(self.__writer_generation, None)
+        self.__header = None
+        self.__raw_file = self.__trigger_file = None
+
+    def __write_header(self):
+        with self.__lock:
+            self.__header['dropped_samples'] = self.__dropped_by_generation.get(self.__writer_generation, 0)
+        with open(self.__stem.with_suffix('.json'), 'w') as f:
+            json.dump(self.__header, f, indent=2)
+
+    def __write_samples(self, sample_idx, block):
+        header = self.__header
+        if header is None or len(block) == 0:
+            return
+        if header['first_sample_idx'] is None:
+            header['first_sample_idx'] = int(sample_idx)
+
+        start = int(sample_idx) - header['first_sample_idx']
+        stop = start + len(block)
+        if start < 0:
+            return
+
+        if self.__mmap is None or stop > len(self.__mmap):
+            self.__grow(stop)
+        self.__mmap[start:stop] = block
+
+        if stop > header['num_samples']:
+            self.recorded_samples += stop - header['num_samples']
+            header['num_samples'] = stop
+
+    def __grow(self, min_rows):
+        """Extends the raw file by whole chunks and remaps it."""
+        num_channels = len(self.__header['channels'])
+        chunk = max(1, int(self.chunk_seconds * self.__header['sampling_rate']))
+        rows = -(-min_rows // chunk) * chunk
+        self.__mmap = None
+        self.__raw_file.truncate(rows * num_channels * np.dtype(RECORDING_DTYPE).itemsize)
+        self.__mmap = np.memmap(self.__raw_file, dtype=RECORDING_DTYPE, mode='r+', shape=(rows, num_channels))
+        self.__write_header()
+
+    def __write_trigger(self, sample_idx, code, mode, wall_time):
+        if self.__trigger_file is not None:
+            self.__trigger_file.write(f"{sample_idx},{code},{mode},{wall_time:.6f}\n")
+            self.__trigger_file.flush()
+
+
+class EMGRecording:
+    """Read-only access to a recording written by EMGRecorder."""
+
+    def __init__(self, path):
+        """Opens a recording.
+
+        Args:
+            path: Any of the recording files, or their common stem
+        """
+        stem = Path(path)
+        if stem.name.endswith('_triggers.csv'):
+            stem = stem.with_name(stem.name[:-len('_triggers.csv')])
+        stem = stem.with_suffix('')
+
+        with open(stem.with_suffix('.json')) as f:
+            self.header = json.load(f)
+        self.sampling_rate = self.header['sampling_rate']
+        self.channels = self.header['channels']
+        self.first_sample_idx = self.header['first_sample_idx'] or 0
+
+        num_samples = self.header['num_samples']
+        if num_samples:
+            self.samples = np.memmap(stem.with_suffix('.f32'), dtype=self.header['dtype'], mode='r',
+                                     shape=(num_samples, len(self.channels)))
+        else:
+            self.samples = np.empty((0, len(self.channels)), dtype=self.header['dtype'])
+
+        self.triggers = np.loadtxt(f"{stem}_triggers.csv", delimiter=',', skiprows=1, ndmin=1,
+                                   dtype=[('sample_idx', np.int64), ('code', np.uint8),
+                                          ('mode', np.uint8), ('wall_time', np.float64)])
+
+    def __len__(self):
+        return len(self.samples)
+
+    def read(self, start_s: float, stop_s: float):
+        """Returns the samples between two times from the start of the recording.
+
+        Returns:
+            Memory-mapped (samples, channels) slice, no data is copied
+        """
+        start = max(0, int(round(start_s * self.sampling_rate)))
+        stop = max(start, int(round(stop_s * self.sampling_rate)))
+        return self.samples[start:stop]
+
+    def read_samples(self, start_idx: int, stop_idx: int):
+        """Returns the samples between two absolute NeurOne sample indexes (zero-copy)."""
+        start = max(0, start_idx - self.first_sample_idx)
+        stop = max(start, stop_idx - self.first_sample_idx)
+        return self.samples[start:stop]
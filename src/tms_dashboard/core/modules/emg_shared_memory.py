@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""EMG acquisition in a separate process, shared with the dashboard through shared memory"""
+
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from tms_dashboard.constants import TriggerType
+from tms_dashboard.config import NEURONE_IP, NEURONE_PORT, NEURONE_BUFFER_SECONDS, NEURONE_MAX_SAMPLING_RATE
+from tms_dashboard.core.modules.emg_connection import neuroOne, TriggeredWindows
+from tms_dashboard.core.modules.emg_filter import EMGFilterConfig
+from tms_dashboard.core.modules.ring_buffer import SampleRingBuffer, has_lost_samples
+
+# int64 header fields at the start of the shared block
+HEADER_FIELDS = (
+    'ring_capacity', 'ring_channels', 'ring_start', 'ring_end',
+    'connected', 'measuring', 'sampling_rate', 'last_trial_id', 'num_active_channels',
+)
+# get_statistics() values mirrored from the acquisition process
+STAT_FIELDS = (
+    'packets_lost', 'pending_triggers', 'captured_windows', 'buffer_size', 'datagrams_received',
+    'queue_depth', 'queue_high_water', 'queue_dropped', 'recorded_samples', 'recorder_dropped',
+)
+# Per-trial slot metadata columns (id 0 marks a slot being written)
+META_ID, META_IDX, META_CODE, META_SAMPLES, META_TRIGGER_NS = range(5)
+META_COLUMNS = 5
+
+_FIELD = {name: i for i, name in enumerate(HEADER_FIELDS + STAT_FIELDS)}
+
+
+class SharedEMGMemory:
+    """Typed views over one shared memory block.
+
+    Layout: int64 header (fields, statistics and active channel ids), the
+    float64 uV/bit factors of the active channels, the (ring_capacity x
+    channels) float32 sample ring, num_trial float32 window slots
+    (channels x max_window_samples) and an int64 metadata row per slot.
+    Both processes build the views from the same geometry arguments.
+    """
+
+    def __init__(self, num_channels: int, ring_capacity: int, num_trial: int, max_window_samples: int,
+                 name: Optional[str] = None):
+        self.num_channels = num_channels
+        self.ring_capacity = ring_capacity
+        self.num_trial = num_trial
+        self.max_window_samples = max_window_samples
+
+        n_header = len(_FIELD) + num_channels
+        sizes = [
+            n_header * 8,
+            num_channels * 8,
+            ring_capacity * num_channels * 4,
+            num_trial * num_channels * max_window_samples * 4,
+            num_trial * META_COLUMNS * 8,
+        ]
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=sum(sizes))
+            self.owner = True
+        else:
+            # Spawned children share the parent's resource tracker, so attaching does not leak the block
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        offsets = np.cumsum([0] + sizes)
+        buf = self.shm.buf
+        self.header = np.ndarray((n_header,), dtype=np.int64, buffer=buf, offset=offsets[0])
+        self.scale_factors = np.ndarray((num_channels,), dtype=np.float64, buffer=buf, offset=offsets[1])
+        self.ring = np.ndarray((ring_capacity, num_channels), dtype=np.float32, buffer=buf, offset=offsets[2])
+        self.trials = np.ndarray((num_trial, num_channels, max_window_samples), dtype=np.float32, buffer=buf, offset=offsets[3])
+        self.trial_meta = np.ndarray((num_trial, META_COLUMNS), dtype=np.int64, buffer=buf, offset=offsets[4])
+
+        if self.owner:
+            self.header[:] = 0
+            self.header[_FIELD['ring_start']] = self.header[_FIELD['ring_end']] = -1
+            self.trial_meta[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def get(self, field: str) -> int:
+        return int(self.header[_FIELD[field]])
+
+    def set(self, field: str, value: int):
+        self.header[_FIELD[field]] = value
+
+    def channel_ids(self):
+        base = len(_FIELD)
+        return self.header[base:base + self.get('num_active_channels')].tolist()
+
+    def close(self):
+        # Views must be dropped before the mapping can be closed
+        self.header = self.scale_factors = self.ring = self.trials = self.trial_meta = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # Writer side (acquisition process)
+
+    def write_trials(self, batch: TriggeredWindows):
+        """Copies a batch of new windows into their slots (neuroOne subscriber)."""
+        n_channels = batch.windows.shape[1]
+        n_samples = min(batch.windows.shape[2], self.max_window_samples)
+        for i, trial_id in enumerate(batch.trial_ids):
+            slot = (trial_id - 1) % self.num_trial
+            self.trial_meta[slot, META_ID] = 0
+            self.trials[slot, :n_channels, :n_samples] = batch.windows[i, :, :n_samples]
+            self.trial_meta[slot, META_IDX] = batch.sample_indexes[i]
+            self.trial_meta[slot, META_CODE] = batch.trigger_codes[i]
+            self.trial_meta[slot, META_SAMPLES] = n_samples
+            # perf_counter is the system-wide monotonic clock, comparable across processes
+            self.trial_meta[slot, META_TRIGGER_NS] = 0 if batch.trigger_times is None else int(batch.trigger_times[i] * 1e9)
+            self.trial_meta[slot, META_ID] = trial_id
+            self.set('last_trial_id', trial_id)
+
+    def publish_status(self, device: neuroOne):
+        self.set('connected', device.get_connection())
+        self.set('measuring', device.get_status())
+        self.set('sampling_rate', device.get_sampling_rate())
+
+        stats = device.get_statistics()
+        for field in STAT_FIELDS:
+            self.set(field, stats.get(field, 0))
+
+        channels = stats['channels'][:self.num_channels]
+        base = len(_FIELD)
+        self.header[base:base + len(channels)] = channels
+        scale_factors = device.get_scale_factors()[:len(channels)]
+        self.scale_factors[:len(scale_factors)] = scale_factors
+        self.set('num_active_channels', len(channels))
+
+
+class SharedSampleRingBuffer(SampleRingBuffer):
+    """SampleRingBuffer stored in shared memory that publishes its indexes in the header."""
+
+    def __init__(self, capacity: int, num_channels: int, memory: SharedEMGMemory):
+        capacity = min(capacity, memory.ring_capacity)
+        super().__init__(capacity, num_channels, storage=memory.ring[:capacity, :num_channels])
+        self.__memory = memory
+        memory.set('ring_start', -1)
+        memory.set('ring_end', -1)
+        memory.set('ring_capacity', capacity)
+        memory.set('ring_channels', num_channels)
+
+    def write(self, sample_idx: int, block):
+        """Stores a block, keeping the published [ring_start, ring_end) safe to read.
+
+        ring_start is advanced past the samples about to be overwritten before
+        writing, and ring_end only covers samples already written, so a reader
+        that checks ring_start again after copying detects any torn window.
+        """
+        self.__memory.set('ring_start', self.__start_after(sample_idx, len(block)))
+        super().write(sample_idx, block)
+        self.__memory.set('ring_end', self.end_idx)
+        self.__memory.set('ring_start', self.first_idx)
+
+    def __start_after(self, sample_idx: int, n_samples: int) -> int:
+        """Oldest index still stored once samples [sample_idx, sample_idx + n_samples) are written."""
+        end_idx = self.end_idx
+        if end_idx is None:
+            return -1  # Nothing published yet
+        new_end = max(end_idx, sample_idx + n_samples)
+        if sample_idx - end_idx >= self.capacity:
+            return max(sample_idx, new_end - self.capacity)  # The whole buffer restarts
+        return max(self.first_idx, new_end - self.capacity)
+
+
+def _acquisition_main(shm_name, geometry, driver_kwargs, stop_event, commands, trials_event):
+    """Entry point of the acquisition process."""
+    memory = SharedEMGMemory(name=shm_name, **geometry)
+    device = neuroOne(**driver_kwargs,
+                      buffer_factory=lambda capacity, channels: SharedSampleRingBuffer(capacity, channels, memory))
+
+    def on_windows(batch):
+        memory.write_trials(batch)
+        # Set after the slots are written; never blocks the parser thread
+        trials_event.set()
+
+    device.subscribe(on_windows)
+    device.start()
+    try:
+        while not stop_event.wait(0.02):
+            memory.publish_status(device)
+            # Driver calls requested by the dashboard process, answered with (seq, None or an error message)
+            while commands.poll():
+                seq, name, kwargs = commands.recv()
+                try:
+                    getattr(device, name)(**kwargs)
+                    commands.send((seq, None))
+                except Exception as e:
+                    commands.send((seq, str(e)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.stop()
+        memory.set('connected', 0)
+        memory.set('measuring', 0)
+        memory.close()
+
+
+class SharedMemoryNeuroOne:
+    """Drop-in replacement for neuroOne that runs the driver in its own process.
+
+    NeurOne reception, parsing and window extraction happen in a child process
+    with its own GIL, writing into a shared memory ring buffer and window slots.
+    This side only reads: windows are copied out of the shared slots and
+    checked against concurrent rewrites, so callers own what they receive.
+    """
+
+    def __init__(self, num_trial: int, t_min, t_max, channels: Sequence[int], trigger_type_interest: TriggerType,
+                 filter_config: Optional[EMGFilterConfig] = None, host: str = NEURONE_IP, port: int = NEURONE_PORT,
+                 recording_dir=None):
+        self.t_min = t_min/1000
+        self.t_max = t_max/1000
+        self.channels = tuple(channels)
+        self.trigger_type_interest = trigger_type_interest
+        self.host = host
+
+        self.__driver_kwargs = dict(num_trial=num_trial, t_min=t_min, t_max=t_max, channels=self.channels,
+                                    trigger_type_interest=trigger_type_interest, filter_config=filter_config,
+                                    host=host, port=port, recording_dir=recording_dir)
+        self.__geometry = dict(
+            num_channels=len(self.channels),
+            ring_capacity=int(NEURONE_MAX_SAMPLING_RATE * NEURONE_BUFFER_SECONDS),
+            num_trial=num_trial,
+            max_window_samples=int(np.ceil((self.t_max - self.t_min) * NEURONE_MAX_SAMPLING_RATE)) + 1,
+        )
+        self.__memory: Optional[SharedEMGMemory] = None
+        self.__process = None
+        self.__stop_event = None
+        self.__commands = None
+        self.__command_seq = 0
+        self.__trials_event = None  # Set by the acquisition process after each batch of new trials
+
+        self.__subscribers = []
+        self.__watcher = None
+        self.__watching = False
+
+    def start(self):
+        if self.__process is not None and self.__process.is_alive():
+            return
+        ctx = mp.get_context('spawn')
+        self.__memory = SharedEMGMemory(**self.__geometry)
+        self.__stop_event = ctx.Event()
+        self.__commands, child_commands = ctx.Pipe()
+        self.__trials_event = ctx.Event()
+        self.__process = ctx.Process(target=_acquisition_main, name="NeurOne-Acquisition", daemon=True,
+                                     args=(self.__memory.name, self.__geometry, self.__driver_kwargs, self.__stop_event,
+                                           child_commands, self.__trials_event))
+        self.__process.start()
+
+    def stop(self):
+        self.__watching = False
+        if self.__trials_event is not None:
+            self.__trials_event.set()  # Wakes the watcher up
+        if self.__watcher is not None:
+            self.__watcher.join()
+            self.__watcher = None
+        if self.__process is not None:
+            self.__stop_event.set()
+            self.__process.join(timeout=5)
+            self.__process = None
+        if self.__memory is not None:
+            self.__memory.close()
+            self.__memory = None
+
+    def get_connection(self):
+        return self.__memory is not None and bool(self.__memory.get('connected'))
+
+    def get_status(self):
+        return self.__memory is not None and bool(self.__memory.get('measuring'))
+
+    def get_sampling_rate(self):
+        return 0 if self.__memory is None else self.__memory.get('sampling_rate')
+
+    def get_channels(self):
+        return [] if self.__memory is None else self.__memory.channel_ids()
+
+    def get_scale_factors(self):
+        if self.__memory is None:
+            return []
+        return self.__memory.scale_factors[:self.__memory.get('num_active_channels')].tolist()
+
+    def get_statistics(self):
+        if self.__memory is None:
+            return {}
+        stats = {field: self.__memory.get(field) for field in STAT_FIELDS}
+        stats['last_trial_id'] = self.__memory.get('last_trial_id')
+        stats['sampling_rate'] = self.get_sampling_rate()
+        stats['channels'] = self.get_channels()
+        stats['acquisition_process_alive'] = self.__process is not None and self.__process.is_alive()
+        return stats
+
+    def get_windows_since(self, cursor: int = 0) -> TriggeredWindows:
+        """Returns copies of the windows captured after a cursor.
+
+        Seqlock read: the slots are copied first, then their ids are read
+        again; a trial whose slot was rewritten meanwhile is dropped.
+        """
+        memory = self.__memory
+        if memory is None or not (memory.get('connected') and memory.get('measuring')):
+            return self.__empty_batch(cursor)
+
+        last_id = memory.get('last_trial_id')
+        first_id = max(cursor + 1, last_id - memory.num_trial + 1)
+        if last_id < first_id:
+            return self.__empty_batch(cursor)
+
+        ids = np.arange(first_id, last_id + 1)
+        slots = (ids - 1) % memory.num_trial
+        meta = memory.trial_meta[slots].copy()
+        n_channels = memory.get('num_active_channels') or memory.num_channels
+        n_samples = int(meta[-1, META_SAMPLES])
+
+        # Slots being rewritten or from another window geometry are skipped
+        valid = (meta[:, META_ID] == ids) & (meta[:, META_SAMPLES] == n_samples)
+        # Fancy indexing copies out of the shared block
+        windows = memory.trials[slots, :n_channels, :n_samples]
+
+        # Seqlock check after the copy: a slot overwritten while copying is dropped
+        valid &= memory.trial_meta[slots, META_ID] == ids
+        if not valid.all():
+            windows = windows[valid]
+            meta = meta[valid]
+            ids = ids[valid]
+            if len(ids) == 0:
+                return self.__empty_batch(last_id)
+
+        return TriggeredWindows(
+            trial_ids=ids.astype(np.int64),
+            sample_indexes=meta[:, META_IDX],
+            trigger_codes=meta[:, META_CODE].astype(np.uint8),
+            windows=windows,
+            cursor=int(last_id),
+            trigger_times=meta[:, META_TRIGGER_NS] / 1e9,
+        )
+
+    def get_triggered_window(self):
+        return self.get_windows_since(0).windows
+
+    def reconfigure(self, t_min=None, t_max=None, channels: Optional[Sequence[int]] = None, num_trial: Optional[int] = None):
+        """Same as neuroOne.reconfigure(), applied in the acquisition process.
+
+        The shared window slots are sized at start(), so the new window and
+        channel count must fit in them.
+        """
+        new_t_min = self.t_min if t_min is None else t_min/1000
+        new_t_max = self.t_max if t_max is None else t_max/1000
+        if int(np.ceil((new_t_max - new_t_min) * NEURONE_MAX_SAMPLING_RATE)) + 1 > self.__geometry['max_window_samples']:
+            raise ValueError("Window longer than the shared slots allocated at start")
+        if channels is not None and len(channels) > self.__geometry['num_channels']:
+            raise ValueError(f"At most {self.__geometry['num_channels']} channels fit in the shared memory")
+
+        if self.__process is not None:
+            error = self.__call('reconfigure', dict(t_min=t_min, t_max=t_max, channels=channels, num_trial=num_trial))
+            if error is not None:
+                raise RuntimeError(f"Reconfiguration failed: {error}")
+
+        # Kept for a restart of the acquisition process
+        self.t_min, self.t_max = new_t_min, new_t_max
+        self.__driver_kwargs.update(t_min=new_t_min*1000, t_max=new_t_max*1000)
+        if channels is not None:
+            self.channels = tuple(channels)
+            self.__driver_kwargs['channels'] = self.channels
+        if num_trial is not None:
+            self.__driver_kwargs['num_trial'] = num_trial
+            self.__geometry['num_trial'] = num_trial
+
+    def __call(self, name: str, kwargs: dict, timeout: float = 5.0):
+        """Runs a driver method in the acquisition process and returns its error message (None on success).
+
+        Requests carry a sequence number; late replies to earlier requests
+        that timed out are discarded.
+        """
+        self.__command_seq += 1
+        seq = self.__command_seq
+        self.__commands.send((seq, name, kwargs))
+        deadline = time.monotonic() + timeout
+        while self.__commands.poll(max(0.0, deadline - time.monotonic())):
+            reply_seq, error = self.__commands.recv()
+            if reply_seq == seq:
+                return error
+        raise RuntimeError("Acquisition process did not answer")
+
+    def extract_windows(self, sample_indexes):
+        """Same as neuroOne.extract_windows(), gathered from the shared ring buffer."""
+        sample_indexes = np.asarray(sample_indexes, dtype=np.int64)
+        memory = self.__memory
+        fs = self.get_sampling_rate()
+        n_channels = 0 if memory is None else memory.get('ring_channels')
+        n_pre = int(abs(self.t_min) * fs)
+        length = n_pre + int(self.t_max * fs)
+        windows = np.zeros((len(sample_indexes), n_channels, length), dtype=np.float32)
+        if memory is None or memory.get('ring_capacity') == 0 or memory.get('ring_end') < 0:
+            return windows, np.zeros(len(sample_indexes), dtype=bool)
+
+        starts = sample_indexes - n_pre
+        valid = (starts >= memory.get('ring_start')) & (starts + length <= memory.get('ring_end'))
+        positions = (starts[valid, None] + np.arange(length)) % memory.get('ring_capacity')
+        windows[valid] = memory.ring[positions, :n_channels].transpose(0, 2, 1)
+        # Windows overwritten while copying or overlapping lost packets are invalid
+        valid &= starts >= memory.get('ring_start')
+        valid &= ~has_lost_samples(windows)
+        windows[~valid] = 0
+        return windows, valid
+
+    def read_samples(self, start_idx: int, stop_idx: int):
+        """Copies raw samples [start_idx, stop_idx) from the shared ring buffer.
+
+        Returns:
+            Array shaped (stop_idx - start_idx, channels), NaN where packets were
+            lost, or None if the range is not (or no longer) available
+        """
+        memory = self.__memory
+        if memory is None:
+            return None
+        capacity = memory.get('ring_capacity')
+        n_channels = memory.get('ring_channels')
+        if capacity == 0 or start_idx < memory.get('ring_start') or stop_idx > memory.get('ring_end'):
+            return None
+
+        positions = np.arange(start_idx, stop_idx) % capacity
+        out = memory.ring[positions, :n_channels]
+        if start_idx < memory.get('ring_start'):
+            return None  # Overwritten while copying
+        return out
+
+    def subscribe(self, callback: Callable[[TriggeredWindows], None]):
+        """Registers a callback for new windows, signalled by the acquisition process."""
+        self.__subscribers.append(callback)
+        if self.__watcher is None:
+            self.__watching = True
+            self.__watcher = threading.Thread(target=self.__watch_loop, daemon=True, name="NeurOne-SharedWatcher")
+            self.__watcher.start()
+
+    def unsubscribe(self, callback):
+        if callback in self.__subscribers:
+            self.__subscribers.remove(callback)
+
+    def __watch_loop(self):
+        cursor = 0 if self.__memory is None else self.__memory.get('last_trial_id')
+        while self.__watching:
+            event = self.__trials_event
+            if event is None:
+                time.sleep(0.1)  # Not started yet
+                continue
+            # The timeout only bounds how long a restart or stop() goes unnoticed
+            if not event.wait(0.5):
+                continue
+            # Cleared before reading: trials written from now on set it again
+            event.clear()
+            if self.__memory is None or self.__memory.get('last_trial_id') <= cursor:
+                continue
+            batch = self.get_windows_since(cursor)
+            cursor = batch.cursor
+            if len(batch) == 0:
+                continue
+            for callback in list(self.__subscribers):
+                try:
+                    callback(batch)
+                except Exception as e:
+                    print(f"Error in triggered window subscriber: {e}")
+
+    def __empty_batch(self, cursor):
+        return TriggeredWindows(
+            trial_ids=np.empty(0, dtype=np.int64),
+            sample_indexes=np.empty(0, dtype=np.int64),
+            trigger_codes=np.empty(0, dtype=np.uint8),
+            windows=np.empty((0, len(self.channels), 0), dtype=np.float32),
+            cursor=cursor,
+            trigger_times=np.empty(0, dtype=np.float64),
+        )
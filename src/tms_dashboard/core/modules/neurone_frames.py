@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Builders for NeurOne Real-time Out UDP frames (simulation and replay)"""
+
+import struct
+
+import numpy as np
+
+from tms_dashboard.constants import FrameType, TriggerType
+
+
+def encode_int24(values) -> bytes:
+    """Encodes integer samples as consecutive int24 big-endian triplets.
+
+    Args:
+        values: Integer array of any shape (row-major order is kept)
+    """
+    values = np.clip(np.asarray(values), -2**23, 2**23 - 1).astype('>i4')
+    return values.reshape(-1, 1).view(np.uint8)[:, 1:].tobytes()
+
+
+def pack_measurement_start(sampling_rate: int, channel_ids, channel_types=None) -> bytes:
+    """MEASUREMENT_START frame announcing the sampling rate and channel layout.
+
+    Args:
+        sampling_rate: Sampling rate in Hz
+        channel_ids: Physical channel id of each position in a bundle
+        channel_types: Type byte of each channel (0 = NeurOne AC, ~100 nV/bit)
+    """
+    channel_ids = list(channel_ids)
+    if channel_types is None:
+        channel_types = [0] * len(channel_ids)
+    header = struct.pack('>B3xI8xH', FrameType.MEASUREMENT_START, sampling_rate, len(channel_ids))
+    return header + struct.pack(f'>{len(channel_ids)}H', *channel_ids) + bytes(channel_types)
+
+
+def pack_samples_header(seq_no: int, num_channels: int, num_bundles: int, first_sample_idx: int) -> bytes:
+    """28-byte header of a SAMPLES frame."""
+    return struct.pack('>B3xIHHQ8x', FrameType.SAMPLES, seq_no % 2**32, num_channels, num_bundles, first_sample_idx)
+
+
+def pack_samples(seq_no: int, first_sample_idx: int, samples) -> bytes:
+    """SAMPLES frame carrying a (bundles, channels) block of raw integer samples."""
+    samples = np.asarray(samples)
+    num_bundles, num_channels = samples.shape
+    return pack_samples_header(seq_no, num_channels, num_bundles, first_sample_idx) + encode_int24(samples)
+
+
+def pack_trigger(triggers) -> bytes:
+    """TRIGGER frame.
+
+    Args:
+        triggers: Iterable of (sample_idx, trigger_code) or
+            (sample_idx, trigger_code, TriggerType) tuples
+    """
+    body = b''
+    count = 0
+    for trigger in triggers:
+        sample_idx, code = trigger[0], trigger[1]
+        mode = trigger[2] if len(trigger) > 2 else TriggerType.STIMULUS
+        body += struct.pack('>8xQBB2x', sample_idx, mode.value & 0x0F, code & 0xFF)
+        count += 1
+    return struct.pack('>BxH4x', FrameType.TRIGGER, count) + body
+
+
+def pack_measurement_end() -> bytes:
+    return struct.pack('>B3x', FrameType.MEASUREMENT_END)
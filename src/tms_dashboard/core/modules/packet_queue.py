@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bounded single-producer/single-consumer datagram queue"""
+
+import threading
+from typing import List
+
+
+class PacketQueue:
+    """Preallocated ring of slots handing datagrams from the receiver to the parser.
+
+    Only the producer moves `tail` and only the consumer moves `head`, so no
+    lock is shared between the two stages (each index is a single attribute
+    store, atomic under the GIL). When the queue is full new datagrams are
+    dropped and counted instead of blocking the receiver. An Event is only
+    used to wake an idle consumer.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self.__slots = [None] * self.capacity
+        self.__head = 0  # Next slot to read (consumer)
+        self.__tail = 0  # Next slot to write (producer)
+        self.__wakeup = threading.Event()
+
+        self.pushed = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        return self.__tail - self.__head
+
+    def push_many(self, datagrams: List[bytes]) -> int:
+        """Enqueues datagrams (producer side), dropping those that do not fit.
+
+        Returns:
+            Number of datagrams accepted
+        """
+        tail = self.__tail
+        free = self.capacity - (tail - self.__head)
+        accepted = datagrams[:free] if len(datagrams) > free else datagrams
+
+        for data in accepted:
+            self.__slots[tail % self.capacity] = data
+            tail += 1
+        self.__tail = tail
+
+        self.pushed += len(accepted)
+        self.dropped += len(datagrams) - len(accepted)
+        self.high_water = max(self.high_water, tail - self.__head)
+        self.__wakeup.set()
+        return len(accepted)
+
+    def pop_all(self, max_items: int = 0) -> List[bytes]:
+        """Dequeues everything currently queued (consumer side)."""
+        head = self.__head
+        tail = self.__tail
+        if max_items:
+            tail = min(tail, head + max_items)
+
+        items = []
+        for i in range(head, tail):
+            slot = i % self.capacity
+            items.append(self.__slots[slot])
+            self.__slots[slot] = None
+        self.__head = tail
+        return items
+
+    def wait(self, timeout: float) -> bool:
+        """Blocks the consumer until something is pushed or the timeout expires."""
+        signaled = self.__wakeup.wait(timeout)
+        self.__wakeup.clear()
+        return signaled
+
+    def wake(self):
+        """Wakes a waiting consumer (e.g. on shutdown)."""
+        self.__wakeup.set()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Fixed-size sample ring buffer addressed by absolute acquisition index"""
+
+import numpy as np
+
+
+class SampleRingBuffer:
+    """Preallocated (capacity x channels) ring buffer for a continuous sample stream.
+
+    Samples are addressed by their absolute index in the acquisition (the
+    NeurOne sample counter), so windows around a trigger can be cut out directly
+    without tracking offsets. Memory is allocated once: capacity * num_channels
+    * itemsize bytes (4 bytes per sample per channel for float32).
+
+    Samples lost between packets are stored as NaN (zero for integer dtypes),
+    so they stay visible in what is read back and windows overlapping them
+    can be rejected.
+    """
+
+    def __init__(self, capacity: int, num_channels: int = 1, dtype=np.float32, storage=None):
+        """Initializes the ring buffer.
+
+        Args:
+            capacity: Number of samples kept per channel
+            num_channels: Number of channels stored side by side
+            dtype: Sample data type
+            storage: Preallocated (capacity, num_channels) array to use instead
+                of allocating one (e.g. a view of shared memory)
+        """
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+
+        self.capacity = int(capacity)
+        self.num_channels = int(num_channels)
+        if storage is None:
+            self.__data = np.zeros((self.capacity, self.num_channels), dtype=dtype)
+        elif storage.shape != (self.capacity, self.num_channels):
+            raise ValueError(f"Storage shape {storage.shape} does not match ({self.capacity}, {self.num_channels})")
+        else:
+            self.__data = storage
+        self.__gap_value = np.nan if np.issubdtype(self.__data.dtype, np.floating) else 0
+        self.__start_idx = None  # Absolute index of the oldest stored sample
+        self.__end_idx = None    # Absolute index one past the newest stored sample
+
+    def __len__(self):
+        if self.__end_idx is None:
+            return 0
+        return self.__end_idx - self.__start_idx
+
+    @property
+    def nbytes(self) -> int:
+        return self.__data.nbytes
+
+    @property
+    def first_idx(self):
+        """Absolute index of the oldest sample still available (None if empty)."""
+        return self.__start_idx
+
+    @property
+    def end_idx(self):
+        """Absolute index one past the newest sample (None if empty)."""
+        return self.__end_idx
+
+    def clear(self):
+        self.__start_idx = None
+        self.__end_idx = None
+
+    def write(self, sample_idx: int, block):
+        """Stores a block of consecutive samples starting at an absolute index.
+
+        Samples already stored (duplicated or late packets) are ignored. A gap
+        left by lost packets is filled with NaN so indexes stay aligned.
+
+        Args:
+            sample_idx: Absolute index of the first sample in block
+            block: Array shaped (n_samples, num_channels) or (n_samples,)
+        """
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+
+        if self.__end_idx is None:
+            self.__start_idx = self.__end_idx = sample_idx
+
+        if sample_idx < self.__end_idx:
+            block = block[self.__end_idx - sample_idx:]
+            sample_idx = self.__end_idx
+        elif sample_idx > self.__end_idx:
+            gap = sample_idx - self.__end_idx
+            if gap >= self.capacity:
+                self.__start_idx = self.__end_idx = sample_idx
+            else:
+                self.__put(self.__end_idx, np.full((gap, self.num_channels), self.__gap_value, dtype=self.__data.dtype))
+
+        if len(block) > 0:
+            self.__put(sample_idx, block)
+
+    def __put(self, sample_idx, block):
+        n = len(block)
+        if n > self.capacity:
+            sample_idx += n - self.capacity
+            block = block[-self.capacity:]
+            n = self.capacity
+
+        pos = sample_idx % self.capacity
+        first = min(n, self.capacity - pos)
+        self.__data[pos:pos + first] = block[:first]
+        if first < n:
+            self.__data[:n - first] = block[first:]
+
+        self.__end_idx = sample_idx + n
+        self.__start_idx = max(self.__start_idx, self.__end_idx - self.capacity)
+
+    def contains(self, start_idx: int, stop_idx: int) -> bool:
+        """Whether all samples in [start_idx, stop_idx) are still stored."""
+        if self.__end_idx is None:
+            return False
+        return self.__start_idx <= start_idx and stop_idx <= self.__end_idx
+
+    def read(self, start_idx: int, stop_idx: int):
+        """Copies samples [start_idx, stop_idx) out of the buffer.
+
+        Only the requested window is copied, also when it wraps around the end
+        of the underlying array.
+
+        Returns:
+            Array shaped (stop_idx - start_idx, num_channels), NaN where packets
+            were lost, or None if the range is not (or no longer) available
+        """
+        if stop_idx < start_idx or not self.contains(start_idx, stop_idx):
+            return None
+
+        n = stop_idx - start_idx
+        pos = start_idx % self.capacity
+        if pos + n <= self.capacity:
+            return self.__data[pos:pos + n].copy()
+
+        first = self.capacity - pos
+        out = np.empty((n, self.num_channels), dtype=self.__data.dtype)
+        out[:first] = self.__data[pos:]
+        out[first:] = self.__data[:n - first]
+        return out
+
+    def read_windows(self, start_indexes, length: int):
+        """Copies many equally long windows out of the buffer in one gather.
+
+        Args:
+            start_indexes: (n,) absolute index of the first sample of each window
+            length: Samples per window
+
+        Returns:
+            (windows, valid): windows shaped (n, length, num_channels) and a
+            (n,) bool mask of the windows fully stored, without lost samples
+            (the others are zeros)
+        """
+        starts = np.asarray(start_indexes, dtype=np.int64).reshape(-1)
+        windows = np.zeros((len(starts), length, self.num_channels), dtype=self.__data.dtype)
+        if self.__end_idx is None:
+            return windows, np.zeros(len(starts), dtype=bool)
+
+        valid = (starts >= self.__start_idx) & (starts + length <= self.__end_idx)
+        positions = (starts[valid, None] + np.arange(length)) % self.capacity
+        windows[valid] = self.__data[positions]
+        lost = has_lost_samples(windows)
+        if lost.any():
+            windows[lost] = 0
+            valid &= ~lost
+        return windows, valid
+
+
+def has_lost_samples(windows):
+    """(n,) bool mask of the windows, shaped (n, ...), holding samples lost between packets (NaN)."""
+    windows = np.asarray(windows)
+    if not np.issubdtype(windows.dtype, np.floating):
+        return np.zeros(len(windows), dtype=bool)
+    return np.isnan(windows.reshape(len(windows), -1)).any(axis=1)
@@ -5,10 +5,12 @@
 import time
 import socketio
 import threading
-from queue import Queue
-from typing import Optional
+from collections import deque
+from typing import Iterable, Optional
 import logging
 
+from tms_dashboard.config import SOCKET_BUFFER_SIZE, SOCKET_OVERFLOW_POLICY, SOCKET_DROPPABLE_TOPICS
+
 # Suppress verbose socketio logs
 logging.getLogger('socketio').setLevel(logging.WARNING)
 logging.getLogger('engineio').setLevel(logging.WARNING)
@@ -17,14 +19,28 @@ logging.getLogger('engineio').setLevel(logging.WARNING)
 class SocketClient:
     """Socket.IO client runs in a dedicated thread so it do s not block NiceGUI."""
     
-    def __init__(self, remote_host: str):
+    def __init__(self, remote_host: str, max_size: int = SOCKET_BUFFER_SIZE,
+                 overflow_policy: str = SOCKET_OVERFLOW_POLICY,
+                 droppable_topics: Iterable[str] = SOCKET_DROPPABLE_TOPICS):
         """Initialize socket client.
         
         Args:
             remote_host: URL do relay server (ex: 'http://127.0.0.1:5000')
+            max_size: Inbound messages kept before droppable topics are dropped
+            overflow_policy: 'drop_oldest' evicts the oldest droppable message, 'drop_newest' refuses the incoming one
+            droppable_topics: Topics that may be dropped on overflow; all others are always kept
         """
+        if overflow_policy not in ('drop_oldest', 'drop_newest'):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
         self.__remote_host = remote_host
-        self.__buffer: Queue = Queue()
+        self.__buffer = deque()
+        self.__buffer_condition = threading.Condition()
+        self.__max_size = max_size
+        self.__overflow_policy = overflow_policy
+        self.__droppable_topics = frozenset(droppable_topics)
+        self.__high_water = 0
+        self.__received = 0
+        self.__dropped = {}  # topic -> messages dropped on overflow
         self.__connected = False
         self.__thread: Optional[threading.Thread] = None
         self.__stop_event = threading.Event()
@@ -60,12 +76,12 @@ class SocketClient:
         @self.__sio.on('to_robot')
         def on_to_robot(msg):
             """Receives menssages from channel to_robot."""
-            self.__buffer.put(msg)
+            self.__put(msg)
         
         @self.__sio.on('to_neuronavigation')
         def on_to_neuronavigation(msg):
             """Receives messages from channel to_neuronavigation."""
-            self.__buffer.put(msg)
+            self.__put(msg)
         
         # Connection Loop using retry
         while not self.__stop_event.is_set():
@@ -126,23 +142,63 @@ class SocketClient:
             print(f"[SocketClient] Error emitting event '{event}': {e}")
             return False
     
-    def get_buffer(self) -> list:
-        """Returns all buffer messages (no block).
+    def __put(self, msg):
+        """Queues an inbound message, applying the overflow policy when the buffer is full."""
+        topic = msg.get('topic') if isinstance(msg, dict) else None
+        with self.__buffer_condition:
+            self.__received += 1
+            if len(self.__buffer) >= self.__max_size:
+                evicted = self.__evict_oldest_droppable() if self.__overflow_policy == 'drop_oldest' else None
+                if evicted is not None:
+                    self.__dropped[evicted] = self.__dropped.get(evicted, 0) + 1
+                elif topic in self.__droppable_topics:
+                    self.__dropped[topic] = self.__dropped.get(topic, 0) + 1
+                    return
+                # Control messages are queued beyond max_size rather than dropped
+            self.__buffer.append(msg)
+            self.__high_water = max(self.__high_water, len(self.__buffer))
+            self.__buffer_condition.notify()
+
+    def __evict_oldest_droppable(self) -> Optional[str]:
+        """Removes the oldest queued droppable message and returns its topic (None if there is none)."""
+        # The oldest messages are usually poses, so the scan stops early
+        for i, queued in enumerate(self.__buffer):
+            queued_topic = queued.get('topic') if isinstance(queued, dict) else None
+            if queued_topic in self.__droppable_topics:
+                del self.__buffer[i]
+                return queued_topic
+        return None
+
+    def get_buffer(self, timeout: Optional[float] = None) -> list:
+        """Returns all buffer messages, drained in one lock acquisition.
+        
+        Args:
+            timeout: None returns at once; otherwise blocks up to timeout seconds for the first message
         
         Returns:
             Message list received since last call
         """
-        messages = []
-        while not self.__buffer.empty():
-            try:
-                messages.append(self.__buffer.get_nowait())
-            except:
-                break
+        with self.__buffer_condition:
+            if timeout is not None and not self.__buffer:
+                self.__buffer_condition.wait(timeout)
+            messages = list(self.__buffer)
+            self.__buffer.clear()
         return messages
     
     def clear_buffer(self) -> None:
-        while not self.__buffer.empty():
-            self.__buffer.get_nowait()
+        with self.__buffer_condition:
+            self.__buffer.clear()
+
+    def get_buffer_statistics(self) -> dict:
+        """Returns the inbound buffer depth, high-water mark and overflow drops per topic."""
+        with self.__buffer_condition:
+            return {
+                'depth': len(self.__buffer),
+                'high_water': self.__high_water,
+                'max_size': self.__max_size,
+                'received': self.__received,
+                'dropped': dict(self.__dropped),
+            }
     
     @property
     def is_connected(self) -> bool:
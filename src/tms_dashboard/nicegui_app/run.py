@@ -2,20 +2,24 @@
 # -*- coding: utf-8 -*-
 """NiceGUI web application main entry point - Simplified version"""
 
+import asyncio
 import threading
-import time
 from nicegui import ui, app
 import traceback
 
-from tms_dashboard.config import DEFAULT_HOST, DEFAULT_PORT, NICEGUI_PORT, STATIC_DIR
+from tms_dashboard.config import DEFAULT_HOST, DEFAULT_PORT, NICEGUI_PORT, STATIC_DIR, NEURONE_CHANNELS, NEURONE_FILTER_ENABLED, \
+    NEURONE_ACQUISITION_PROCESS, NEURONE_RECORD_ENABLED, NEURONE_RECORDING_DIR, UI_MIN_UPDATE_INTERVAL, UI_IDLE_REFRESH
 from tms_dashboard.constants import TriggerType
 
 from tms_dashboard.core.dashboard_state import DashboardState
 from tms_dashboard.core.robot_config_state import RobotConfigState
 from tms_dashboard.core.modules.socket_client import SocketClient
 from tms_dashboard.core.modules.emg_connection import neuroOne
+from tms_dashboard.core.modules.emg_shared_memory import SharedMemoryNeuroOne
+from tms_dashboard.core.modules.emg_filter import EMGFilterConfig
 from tms_dashboard.core.message_handler import MessageHandler
 from tms_dashboard.core.message_emit import Message2Server
+from tms_dashboard.core.mep_fast_path import MEPFastPath
 from tms_dashboard.nicegui_app.update_dashboard import UpdateDashboard
 from tms_dashboard.nicegui_app.client_manager import ClientManager
 from tms_dashboard.nicegui_app.ui_state import DashboardUI
@@ -29,9 +33,21 @@ robot_config = RobotConfigState()
 socket_client = SocketClient(f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
 message_emit = Message2Server(socket_client, dashboard)
 message_handler = MessageHandler(socket_client, dashboard, robot_config, message_emit)
-neuroone_connection = neuroOne(num_trial=20, t_min=-5, t_max=40, ch=33, trigger_type_interest=TriggerType.STIMULUS)
+emg_driver = SharedMemoryNeuroOne if NEURONE_ACQUISITION_PROCESS else neuroOne
+neuroone_connection = emg_driver(num_trial=20, t_min=-5, t_max=40, channels=NEURONE_CHANNELS, trigger_type_interest=TriggerType.STIMULUS,
+                                 filter_config=EMGFilterConfig() if NEURONE_FILTER_ENABLED else None,
+                                 recording_dir=NEURONE_RECORDING_DIR if NEURONE_RECORD_ENABLED else None)
 update_dashboard = UpdateDashboard(dashboard, neuroone_connection, client_manager)
 
+# Windows are processed and sent to neuronavigation as soon as the driver completes them
+mep_fast_path = MEPFastPath(neuroone_connection, dashboard, message_emit)
+
+def request_mep_reconfigure(t_min=None, t_max=None, channels=None, num_trial=None,
+                            baseline_start_ms=None, baseline_end_ms=None):
+    """Queues a change of the MEP window (ms), channels, driver history or baseline."""
+    mep_fast_path.request_reconfigure(t_min=t_min, t_max=t_max, channels=channels, num_trial=num_trial,
+                                      baseline_start_ms=baseline_start_ms, baseline_end_ms=baseline_end_ms)
+
 # Flag to ensure background thread starts only once
 _background_thread_started = False
 
@@ -52,23 +68,8 @@ def start_background_services():
         """Continuously process messages and update dashboard (non-UI work only)."""
         while True:
             try:
-                time.sleep(0.1)
-                message_handler.process_messages()
-
-                if neuroone_connection.get_connection() and neuroone_connection.get_status():
-                    dashboard.mep_sampling_rate = neuroone_connection.get_sampling_rate()
-                    mep_history = list(neuroone_connection.get_triggered_window())
-                    dashboard.update_mep_history(mep_history,
-                                                neuroone_connection.t_min,
-                                                neuroone_connection.t_max,
-                                                dashboard.mep_sampling_rate)
-                else:
-                    if dashboard.get_all_state_mep():
-                        dashboard.reset_all_state_mep()
-
-                if dashboard.status_new_mep:
-                    new_meps_only = [dashboard.mep_p2p_history_baseline[i] for i in dashboard.new_meps_index]
-                    message_emit.send_mep_value(new_meps_only)
+                # Blocks until messages arrive; the timeout keeps the inactivity check running
+                message_handler.process_messages(timeout=1.0)
 
             except Exception as e:
                 print("Error processing messages", e)
@@ -77,10 +78,11 @@ def start_background_services():
     # Start socket client
     socket_client.connect()
     neuroone_connection.start()
+    mep_fast_path.start()
     
     # Start message processing thread (non-UI work only)
     threading.Thread(target=process_messages_loop, daemon=True, name="MessageProcessor").start()
-    print("Background services started (socket client + message processor)")
+    print("Background services started (socket client + message processor + MEP fast path)")
 
 @ui.page('/')
 def index():
@@ -107,20 +109,29 @@ def index():
     client_manager.register(ui_state)
     
     # Register cleanup on disconnect
-    ui.context.client.on_disconnect(lambda: client_manager.unregister(ui_state))
+    connected = [True]
+    def on_disconnect():
+        connected[0] = False
+        client_manager.unregister(ui_state)
+    ui.context.client.on_disconnect(on_disconnect)
 
     # Build UI using shared dashboard instance and per-session UI state
     create_header(dashboard, robot_config, message_emit)
     create_dashboard_tabs(dashboard, message_emit, ui_state)
 
-    # Per-client UI update timer — runs on NiceGUI's event loop, not a background thread
-    def update_client_ui():
-        try:
-            update_dashboard.update_single(ui_state)
-        except Exception:
-            pass
-
-    ui.timer(0.1, update_client_ui)
+    # Per-client UI updates — run on NiceGUI's event loop as soon as the processing threads notify a change
+    async def update_client_ui():
+        version = dashboard.notifier.version
+        while connected[0]:
+            try:
+                update_dashboard.update_single(ui_state)
+            except Exception:
+                pass
+            # Bursts of changes (camera-rate poses) are coalesced into one refresh per interval
+            await asyncio.sleep(UI_MIN_UPDATE_INTERVAL)
+            version = await dashboard.notifier.wait_async(version, timeout=UI_IDLE_REFRESH)
+
+    ui.timer(0, update_client_ui, once=True)
 
 
 def main():
@@ -185,11 +185,13 @@ class UpdateDashboard:
         t_max_ms = self.emg_connection.t_max * 1000
         
         # No action when no data available
-        if not dashboard.mep_history_baseline:
+        if len(dashboard.mep_history_baseline) == 0:
             return
             
-        mep_history = list(dashboard.mep_history_baseline)[-num_windows:]
-        mep_p2p_history = list(dashboard.mep_p2p_history_baseline)[-num_windows:]
+        channel = dashboard.mep_display_channel
+        mep_history = dashboard.mep_history_baseline[-num_windows:, channel]
+        mep_p2p_history = dashboard.mep_p2p_history_baseline[-num_windows:, channel]
+        rejected = dashboard.mep_reject_flags[-len(mep_history):] != 0
 
         # X Axis
         t_ms = np.linspace(t_min_ms, t_max_ms, len(mep_history[0]))
@@ -201,7 +203,7 @@ class UpdateDashboard:
             traces.append(go.Scatter(
                 x=t_ms, y=mep,
                 mode='lines',
-                line=dict(color='rgba(128, 128, 128, 0.5)', width=1.5),
+                line=dict(color='rgba(128, 128, 128, 0.5)', width=1.5, dash='dot' if rejected[i] else 'solid'),
                 showlegend=False,
                 hoverinfo='skip', # Optimization: ignores hover on history 
                 name=f'Trial {i}'
@@ -225,7 +227,7 @@ class UpdateDashboard:
             traces.append(go.Scatter(
                 x=t_ms, y=last_mep,
                 mode='lines',
-                line=dict(color='#dc2626', width=3),
+                line=dict(color='#dc2626', width=3, dash='dot' if rejected[-1] else 'solid'),
                 name='Last Response',
                 showlegend=False 
             ))
@@ -234,7 +236,7 @@ class UpdateDashboard:
                 traces.append(go.Scatter(
                     x=[t_ms[peak_idx]], y=[last_mep[peak_idx]],
                     mode='text',
-                    text=[f'{mep_p2p_history[-1]:.0f} µV'],
+                    text=[f'{mep_p2p_history[-1]:.0f} µV' + (' (rejected)' if rejected[-1] else '')],
                     textposition='top center',
                     textfont=dict(color='#dc2626', size=24, weight='bold'),
                     showlegend=False,
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Running per-condition MEP statistics indexed by trigger code"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+
+from tms_dashboard.utils.growable_array import GrowableArray
+
+
+@dataclass
+class ConditionStats:
+    """Incrementally updated statistics of the trials of one trigger code.
+
+    The mean waveform and the p2p mean/variance (Welford, merged batch by
+    batch with Chan's formula) cost O(new trials) per update, independent of
+    the number of trials already seen.
+    """
+    code: int
+    count: int = 0
+    mean_waveform: Optional[np.ndarray] = None  # (channels, samples) mean baseline-corrected window
+    p2p_mean: Optional[np.ndarray] = None       # (channels,)
+    p2p_m2: Optional[np.ndarray] = None         # (channels,) sum of squared deviations from the mean
+    trial_indexes: GrowableArray = field(default_factory=lambda: GrowableArray(np.int64))
+
+    def update(self, indexes, windows, p2p):
+        """Adds a batch of trials of this condition.
+
+        Args:
+            indexes: (trials,) positions of the trials in the session history
+            windows: (trials, channels, samples) baseline-corrected windows
+            p2p: (trials, channels) peak-to-peak amplitudes
+        """
+        n_new = len(indexes)
+        if n_new == 0:
+            return
+        p2p = np.asarray(p2p, dtype=np.float64)
+        batch_mean = p2p.mean(axis=0)
+        batch_m2 = ((p2p - batch_mean) ** 2).sum(axis=0)
+        window_sum = np.asarray(windows, dtype=np.float64).sum(axis=0)
+
+        if self.count == 0:
+            self.mean_waveform = window_sum / n_new
+            self.p2p_mean = batch_mean
+            self.p2p_m2 = batch_m2
+        else:
+            total = self.count + n_new
+            delta = batch_mean - self.p2p_mean
+            self.p2p_mean = self.p2p_mean + delta * n_new / total
+            self.p2p_m2 = self.p2p_m2 + batch_m2 + delta ** 2 * self.count * n_new / total
+            self.mean_waveform = self.mean_waveform + (window_sum - n_new * self.mean_waveform) / total
+
+        self.count += n_new
+        self.trial_indexes.append(indexes)
+
+    @property
+    def p2p_std(self) -> Optional[np.ndarray]:
+        """Sample standard deviation of p2p per channel (zeros with a single trial)."""
+        if self.count == 0:
+            return None
+        if self.count == 1:
+            return np.zeros_like(self.p2p_m2)
+        return np.sqrt(self.p2p_m2 / (self.count - 1))
+
+    @property
+    def p2p_sem(self) -> Optional[np.ndarray]:
+        """Standard error of the p2p mean per channel."""
+        std = self.p2p_std
+        return None if std is None else std / np.sqrt(self.count)
+
+
+class ConditionIndex:
+    """Per-condition statistics of a session, keyed by 8-bit trigger code."""
+
+    def __init__(self):
+        self.__conditions: Dict[int, ConditionStats] = {}
+
+    def __len__(self):
+        return len(self.__conditions)
+
+    def __contains__(self, code):
+        return int(code) in self.__conditions
+
+    def codes(self):
+        """Trigger codes seen so far, in ascending order."""
+        return sorted(self.__conditions)
+
+    def get(self, code) -> Optional[ConditionStats]:
+        return self.__conditions.get(int(code))
+
+    def update(self, codes, indexes, windows, p2p):
+        """Dispatches a batch of trials to the statistics of their conditions.
+
+        Args:
+            codes: (trials,) trigger code of each trial
+            indexes: (trials,) positions of the trials in the session history
+            windows: (trials, channels, samples) baseline-corrected windows
+            p2p: (trials, channels) peak-to-peak amplitudes
+        """
+        codes = np.asarray(codes)
+        for code in np.unique(codes):
+            mask = codes == code
+            stats = self.__conditions.get(int(code))
+            if stats is None:
+                stats = self.__conditions[int(code)] = ConditionStats(int(code))
+            stats.update(np.asarray(indexes)[mask], windows[mask], p2p[mask])
+
+    def summary(self):
+        """Returns {code: (count, p2p mean, p2p sem)} with per-channel lists."""
+        return {code: (stats.count, stats.p2p_mean.tolist(), stats.p2p_sem.tolist())
+                for code, stats in sorted(self.__conditions.items())}
+
+    def clear(self):
+        self.__conditions.clear()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Append-only NumPy array with amortized O(1) appends"""
+
+import numpy as np
+
+
+class GrowableArray:
+    """Append-only array that grows along its first axis.
+
+    Storage is over-allocated and doubled when full, so appending k rows costs
+    O(k) amortized instead of copying the whole history like np.concatenate.
+    `values` returns a view of the filled rows; rows already published through
+    a view are never written again.
+    """
+
+    def __init__(self, dtype=None, initial_capacity: int = 64):
+        """Initializes an empty array.
+
+        Args:
+            dtype: Element type (taken from the first append if None)
+            initial_capacity: Number of rows allocated on the first append
+        """
+        self.__dtype = dtype
+        self.__initial_capacity = initial_capacity
+        self.__data = None
+        self.__size = 0
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def row_shape(self):
+        """Shape of a single row (None while empty)."""
+        return None if self.__data is None else self.__data.shape[1:]
+
+    @property
+    def values(self) -> np.ndarray:
+        """View of the filled rows."""
+        if self.__data is None:
+            return np.empty(0, dtype=self.__dtype)
+        return self.__data[:self.__size]
+
+    def append(self, rows):
+        """Appends rows shaped (n, *row_shape)."""
+        rows = np.asarray(rows, dtype=self.__dtype)
+        n = len(rows)
+
+        if self.__data is None:
+            self.__data = np.empty((max(self.__initial_capacity, n),) + rows.shape[1:], dtype=rows.dtype)
+        elif rows.shape[1:] != self.__data.shape[1:]:
+            raise ValueError(f"Row shape {rows.shape[1:]} does not match {self.__data.shape[1:]}")
+
+        if self.__size + n > len(self.__data):
+            grown = np.empty((max(2 * len(self.__data), self.__size + n),) + self.__data.shape[1:], dtype=self.__data.dtype)
+            grown[:self.__size] = self.__data[:self.__size]
+            self.__data = grown
+
+        self.__data[self.__size:self.__size + n] = rows
+        self.__size += n
+
+    def clear(self):
+        """Drops all rows (and the row shape)."""
+        self.__data = None
+        self.__size = 0
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Fixed-bin latency histogram with O(1) memory"""
+
+import threading
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """Counts latencies in fixed-width millisecond bins.
+
+    Recording is a bincount over the new values, so memory stays constant for
+    any number of samples. Percentiles are resolved to the bin width; values
+    beyond the last bin land in an overflow bin.
+    """
+
+    def __init__(self, bin_ms: float = 1.0, max_ms: float = 500.0):
+        """Initializes an empty histogram.
+
+        Args:
+            bin_ms: Width of a bin in milliseconds
+            max_ms: Upper edge of the last regular bin
+        """
+        self.bin_ms = bin_ms
+        self.num_bins = int(np.ceil(max_ms / bin_ms))
+        self.__counts = np.zeros(self.num_bins + 1, dtype=np.int64)  # Last bin is the overflow
+        self.__sum_ms = 0.0
+        self.__max_ms = 0.0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return int(self.__counts.sum())
+
+    def record(self, latencies_ms):
+        """Adds one or more latencies in milliseconds."""
+        values = np.atleast_1d(np.asarray(latencies_ms, dtype=np.float64))
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        bins = np.clip((values / self.bin_ms).astype(np.int64), 0, self.num_bins)
+        with self.__lock:
+            self.__counts += np.bincount(bins, minlength=self.num_bins + 1)
+            self.__sum_ms += float(values.sum())
+            self.__max_ms = max(self.__max_ms, float(values.max()))
+
+    def reset(self):
+        with self.__lock:
+            self.__counts[:] = 0
+            self.__sum_ms = 0.0
+            self.__max_ms = 0.0
+
+    def counts(self):
+        """Returns (bin lower edges in ms, counts); the last entry is the overflow bin."""
+        with self.__lock:
+            return np.arange(self.num_bins + 1) * self.bin_ms, self.__counts.copy()
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bin holding the q-th percentile (NaN when empty)."""
+        with self.__lock:
+            total = self.__counts.sum()
+            if total == 0:
+                return float('nan')
+            idx = int(np.searchsorted(np.cumsum(self.__counts), q / 100 * total))
+        return (min(idx, self.num_bins) + 1) * self.bin_ms
+
+    def summary(self):
+        """Count, mean, p50/p90/p99 and max in milliseconds."""
+        count = len(self)
+        with self.__lock:
+            mean = self.__sum_ms / count if count else float('nan')
+            max_ms = self.__max_ms
+        return {
+            'count': count,
+            'mean_ms': mean,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p99_ms': self.percentile(99),
+            'max_ms': max_ms,
+        }
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Vectorized MEP trial quality checks"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from tms_dashboard.utils.signal_processing import time_to_index
+
+# Reject reason bits
+REJECT_PRE_RMS = 1     # Muscle pre-activation before the pulse
+REJECT_SATURATED = 2   # Amplifier saturation anywhere in the window
+REJECT_ARTIFACT = 4    # TMS artifact larger than allowed
+
+FULL_SCALE_COUNTS = 2 ** 23  # int24 samples: full scale in uV is this times the channel's uV/bit factor
+
+
+@dataclass
+class MEPQualityConfig:
+    """Rejection thresholds (uV unless noted); None disables a check."""
+    max_pre_rms_uv: Optional[float] = 20.0
+    saturation_fraction: Optional[float] = 0.95  # Of each channel's full scale (FULL_SCALE_COUNTS x uV/bit)
+    max_artifact_uv: Optional[float] = None
+    pre_end_ms: float = -1.0                    # Pre-trigger segment ends here, before the pulse artifact
+    artifact_ms: tuple = (0.0, 5.0)             # Interval holding the TMS artifact
+
+
+@dataclass
+class QualityResult:
+    """Quality measures of a batch of windows."""
+    pre_rms: np.ndarray            # (trials, channels) RMS of the mean-removed pre-trigger segment
+    peak_abs: np.ndarray           # (trials, channels) largest absolute value of the window
+    artifact_amplitude: np.ndarray  # (trials, channels) peak-to-peak in the artifact interval
+    reject_flags: np.ndarray       # (trials,) uint8 OR of the REJECT_* bits over channels
+
+    @property
+    def accepted(self) -> np.ndarray:
+        return self.reject_flags == 0
+
+
+def assess_quality_batch(windows, sampling_rate, signal_start_ms, config: MEPQualityConfig, scale_factors=None):
+    """Computes the quality measures of a whole trial matrix with a few reductions.
+
+    Args:
+        windows: Raw windows shaped (trials, channels, samples) in uV
+        sampling_rate: Sampling rate in Hz
+        signal_start_ms: Time of the first sample relative to the trigger, in ms
+        config: Rejection thresholds
+        scale_factors: uV/bit factor of each channel, giving its saturation level; the
+            saturation check is skipped when they are unknown or do not match the channels
+
+    Returns:
+        QualityResult
+    """
+    windows = np.asarray(windows)
+    if windows.ndim == 2:
+        windows = windows[:, None, :]
+    total_samples = windows.shape[-1]
+
+    pre_stop = time_to_index(config.pre_end_ms, signal_start_ms, sampling_rate, total_samples)
+    if pre_stop > 1:
+        pre_rms = windows[..., :pre_stop].std(axis=-1)
+    else:
+        pre_rms = np.zeros(windows.shape[:2], dtype=np.float32)
+
+    if total_samples:
+        # Two reductions instead of materializing np.abs(windows)
+        peak_abs = np.maximum(windows.max(axis=-1), -windows.min(axis=-1))
+    else:
+        peak_abs = np.zeros(windows.shape[:2], dtype=np.float32)
+
+    art_start = time_to_index(config.artifact_ms[0], signal_start_ms, sampling_rate, total_samples)
+    art_stop = time_to_index(config.artifact_ms[1], signal_start_ms, sampling_rate, total_samples)
+    if art_stop > art_start:
+        segment = windows[..., art_start:art_stop]
+        artifact_amplitude = segment.max(axis=-1) - segment.min(axis=-1)
+    else:
+        artifact_amplitude = np.zeros(windows.shape[:2], dtype=np.float32)
+
+    flags = np.zeros(len(windows), dtype=np.uint8)
+    if config.max_pre_rms_uv is not None:
+        flags |= np.where((pre_rms > config.max_pre_rms_uv).any(axis=1), REJECT_PRE_RMS, 0).astype(np.uint8)
+    if config.saturation_fraction is not None and scale_factors is not None and len(scale_factors) == windows.shape[1]:
+        saturation_uv = config.saturation_fraction * FULL_SCALE_COUNTS * np.asarray(scale_factors, dtype=np.float64)
+        flags |= np.where((peak_abs >= saturation_uv).any(axis=1), REJECT_SATURATED, 0).astype(np.uint8)
+    if config.max_artifact_uv is not None:
+        flags |= np.where((artifact_amplitude > config.max_artifact_uv).any(axis=1), REJECT_ARTIFACT, 0).astype(np.uint8)
+
+    return QualityResult(pre_rms=pre_rms, peak_abs=peak_abs, artifact_amplitude=artifact_amplitude, reject_flags=flags)
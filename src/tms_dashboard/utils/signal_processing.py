@@ -1,6 +1,22 @@
+from dataclasses import dataclass
+
 import numpy as np
 
 
+@dataclass
+class P2PResult:
+    """Peak-to-peak measures of a batch of windows, one value per trial (and channel)."""
+    amplitude: np.ndarray          # Peak minus trough
+    peak_latency_ms: np.ndarray    # Latency of the maximum, relative to the trigger
+    trough_latency_ms: np.ndarray  # Latency of the minimum, relative to the trigger
+
+
+def time_to_index(time_ms, signal_start_ms, sampling_rate, total_samples):
+    """Converts a time relative to the trigger into a sample index clipped to the window."""
+    idx = int((time_ms - signal_start_ms) * sampling_rate / 1000)
+    return max(0, min(idx, total_samples))
+
+
 def apply_baseline(baseline_start_ms, baseline_end_ms, signal_start_ms, signal_end_ms, data, sampling_rate):
     """
     Applies a correction on a signal baseline.
@@ -10,32 +26,72 @@ def apply_baseline(baseline_start_ms, baseline_end_ms, signal_start_ms, signal_e
         baseline_end_ms: Baseline interval end in milliseconds (ex: 20)
         signal_start_ms: Start of the whole signal in milliseconds  (ex: -10)
         signal_end_ms: End of the whole signal in milliseconds (ex: 40)
-        data: Array containing signal data
+        data: Array containing signal data, time along the last axis (any
+            leading trials/channels axes are corrected in the same pass)
         sampling_rate: Sampling rate in Hz
         
     Returns:
         Array with corrected baseline
     """
-    # Calculates total number of samples
-    total_samples = len(data)
-    
-    # Calculates baseline indexes
-    # Converts relative time to the signal start as an index to the array
-    baseline_start_idx = int((baseline_start_ms - signal_start_ms) * sampling_rate / 1000)
-    baseline_end_idx = int((baseline_end_ms - signal_start_ms) * sampling_rate / 1000)
-    
-    # Guarantees indexes are within bounds
-    baseline_start_idx = max(0, min(baseline_start_idx, total_samples - 1))
-    baseline_end_idx = max(0, min(baseline_end_idx, total_samples))
-    
-    # Calculates baseline
-    data_baseline = data[baseline_start_idx:baseline_end_idx]
-    mean_baseline = np.mean(data_baseline)
-    
-    # Subtract baseline from whole sginal
-    data_corrected = data - mean_baseline
-    
-    return data_corrected
+    corrected, _ = baseline_correct_batch(data, baseline_start_ms, baseline_end_ms, signal_start_ms, sampling_rate)
+    return corrected
+
+
+def baseline_correct_batch(windows, baseline_start_ms, baseline_end_ms, signal_start_ms, sampling_rate):
+    """
+    Baseline-corrects a whole matrix of windows in a single reduction.
+
+    Args:
+        windows: Array shaped (trials, samples) or (trials, channels, samples)
+        baseline_start_ms: Baseline interval start in milliseconds
+        baseline_end_ms: Baseline interval end in milliseconds
+        signal_start_ms: Time of the first sample in milliseconds
+        sampling_rate: Sampling rate in Hz
+
+    Returns:
+        Tuple (corrected windows, baseline means shaped like windows without the time axis)
+    """
+    windows = np.asarray(windows)
+    total_samples = windows.shape[-1]
+    start_idx = min(time_to_index(baseline_start_ms, signal_start_ms, sampling_rate, total_samples), total_samples - 1)
+    end_idx = time_to_index(baseline_end_ms, signal_start_ms, sampling_rate, total_samples)
+
+    means = windows[..., start_idx:end_idx].mean(axis=-1)
+    return windows - means[..., None], means
+
+
+def p2p_batch(windows, sampling_rate, signal_start_ms, start_ms=10):
+    """
+    Peak-to-peak amplitude and peak/trough latencies of a matrix of windows.
+
+    The search runs from start_ms to the end of each window. Extremes are
+    located with one argmax and one argmin over the time axis, and their
+    values gathered from those indexes.
+
+    Args:
+        windows: Array shaped (trials, samples) or (trials, channels, samples)
+        sampling_rate: Sampling rate in Hz
+        signal_start_ms: Time of the first sample in milliseconds
+        start_ms: Start of the search interval in milliseconds
+
+    Returns:
+        P2PResult with arrays shaped like windows without the time axis
+    """
+    windows = np.asarray(windows)
+    start_idx = time_to_index(start_ms, signal_start_ms, sampling_rate, windows.shape[-1])
+    cropped = windows[..., start_idx:]
+
+    peak_idx = cropped.argmax(axis=-1)
+    trough_idx = cropped.argmin(axis=-1)
+    peak = np.take_along_axis(cropped, peak_idx[..., None], axis=-1)[..., 0]
+    trough = np.take_along_axis(cropped, trough_idx[..., None], axis=-1)[..., 0]
+
+    ms_per_sample = 1000 / sampling_rate
+    return P2PResult(
+        amplitude=peak - trough,
+        peak_latency_ms=signal_start_ms + (start_idx + peak_idx) * ms_per_sample,
+        trough_latency_ms=signal_start_ms + (start_idx + trough_idx) * ms_per_sample,
+    )
 
 
 def set_apply_baseline_all(baseline_start_ms, baseline_end_ms, signal_start_ms, signal_end_ms, data_windows, sampling_rate):
@@ -47,45 +103,78 @@ def set_apply_baseline_all(baseline_start_ms, baseline_end_ms, signal_start_ms,
         baseline_end_ms: Baseline interval end in milliseconds
         signal_start_ms: Start of the whole signal in milliseconds
         signal_end_ms: End of the whole signal in milliseconds
-        data_windows: Arrays list containing data windows
+        data_windows: Data windows shaped (trials, samples) or (trials, channels, samples)
         sampling_rate: Sampling rate in Hz
         
     Returns:
-        Arrays list containing baseline-corrected data windows
+        Array of baseline-corrected data windows with the same shape
     """
-    processed_data = []
-    for window in data_windows:
-        corrected = apply_baseline(
-            baseline_start_ms, 
-            baseline_end_ms, 
-            signal_start_ms, 
-            signal_end_ms, 
-            window, 
-            sampling_rate
-        )
-        processed_data.append(corrected)
-    return processed_data
-
-def new_indexes_fast_tol(A, B, decimals=5):
+    corrected, _ = baseline_correct_batch(data_windows, baseline_start_ms, baseline_end_ms, signal_start_ms, sampling_rate)
+    return corrected
+
+
+def p2p_from_time(signal, fs, tmin_ms, start_ms=10):
     """
-    Returns the indexes B whose temporal series
-    do not exist in (with numerical tolerance).
+    Peak-to-peak amplitude from start_ms to the end of the window.
+
+    Time runs along the last axis, so a (trials, channels, samples) array
+    returns a (trials, channels) array of amplitudes.
     """
-    A = np.asarray(A)
-    B = np.asarray(B)
+    return np.round(p2p_batch(signal, fs, tmin_ms, start_ms).amplitude, 2)
 
-    # Quantization (stable and fast)
-    Aq = np.round(A, decimals=decimals)
-    Bq = np.round(B, decimals=decimals)
 
-    # Hash per line
-    set_A = {tuple(row) for row in Aq}
+# One record per trial and channel, filled by mep_metrics_batch
+MEP_METRICS_DTYPE = np.dtype([
+    ('amplitude', np.float32),          # Peak-to-peak in uV
+    ('onset_latency_ms', np.float32),   # First threshold crossing (NaN when there is none)
+    ('peak_latency_ms', np.float32),
+    ('trough_latency_ms', np.float32),
+    ('area_uv_ms', np.float32),         # Rectified area of the search interval
+])
 
-    # New indexes
-    return [i for i, row in enumerate(Bq) if tuple(row) not in set_A]
 
-def p2p_from_time(signal, fs, tmin_ms, start_ms=10):
-    signal = np.asarray(signal)
-    start_idx = int(round((start_ms - tmin_ms) * fs / 1000))
-    cropped = signal[start_idx:]
-    return round(np.ptp(cropped),2)
\ No newline at end of file
+def mep_metrics_batch(windows, sampling_rate, signal_start_ms, start_ms=10, onset_sd=5.0, onset_min_uv=20.0):
+    """
+    Onset, peak and trough latencies, p2p and rectified area of a matrix of windows.
+
+    Everything is measured from start_ms to the end of each window. The onset
+    is the first sample whose absolute value exceeds the larger of onset_sd
+    pre-trigger standard deviations and onset_min_uv, found with one argmax
+    over a boolean matrix.
+
+    Args:
+        windows: Baseline-corrected array shaped (trials, samples) or (trials, channels, samples)
+        sampling_rate: Sampling rate in Hz
+        signal_start_ms: Time of the first sample relative to the trigger, in milliseconds
+        start_ms: Start of the search interval in milliseconds
+        onset_sd: Onset threshold in pre-trigger standard deviations
+        onset_min_uv: Lower bound of the onset threshold in uV
+
+    Returns:
+        Structured array of MEP_METRICS_DTYPE shaped like windows without the time axis
+    """
+    windows = np.asarray(windows)
+    total_samples = windows.shape[-1]
+    ms_per_sample = 1000 / sampling_rate
+    start_idx = time_to_index(start_ms, signal_start_ms, sampling_rate, total_samples)
+    metrics = np.full(windows.shape[:-1], np.nan, dtype=MEP_METRICS_DTYPE)
+    if start_idx >= total_samples:
+        return metrics
+
+    p2p = p2p_batch(windows, sampling_rate, signal_start_ms, start_ms)
+    metrics['amplitude'] = p2p.amplitude
+    metrics['peak_latency_ms'] = p2p.peak_latency_ms
+    metrics['trough_latency_ms'] = p2p.trough_latency_ms
+
+    rectified = np.abs(windows[..., start_idx:])
+    metrics['area_uv_ms'] = rectified.sum(axis=-1) * ms_per_sample
+
+    pre_stop = time_to_index(0, signal_start_ms, sampling_rate, total_samples)
+    threshold = np.full(windows.shape[:-1], onset_min_uv, dtype=np.float64)
+    if pre_stop > 1:
+        threshold = np.maximum(threshold, onset_sd * windows[..., :pre_stop].std(axis=-1))
+    above = rectified > threshold[..., None]
+    first = above.argmax(axis=-1)
+    metrics['onset_latency_ms'] = np.where(above.any(axis=-1),
+                                           signal_start_ms + (start_idx + first) * ms_per_sample, np.nan)
+    return metrics
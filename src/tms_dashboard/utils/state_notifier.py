@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Change notification between the processing threads and the UI event loop"""
+
+import asyncio
+import threading
+
+
+class StateNotifier:
+    """Versioned change signal that threads and asyncio tasks can wait on.
+
+    Writers call notify() after changing the state; each call bumps a version
+    counter. Readers wait until the version differs from the last one they
+    have seen, so a notification sent while they were busy is never missed.
+    """
+
+    def __init__(self):
+        self.__version = 0
+        self.__condition = threading.Condition()
+        self.__async_waiters = []  # (loop, future) of pending wait_async calls
+
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    def notify(self):
+        """Signals a state change to every waiter (safe from any thread)."""
+        with self.__condition:
+            self.__version += 1
+            version = self.__version
+            waiters, self.__async_waiters = self.__async_waiters, []
+            self.__condition.notify_all()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, version)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def wait(self, version: int, timeout: float = None) -> int:
+        """Blocks until the version differs from the given one or the timeout expires.
+
+        Returns:
+            Current version (unchanged on timeout)
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__version != version, timeout)
+            return self.__version
+
+    async def wait_async(self, version: int, timeout: float = None) -> int:
+        """Awaitable wait(), for coroutines running on an asyncio loop.
+
+        Returns:
+            Current version (unchanged on timeout)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.__condition:
+            if self.__version != version:
+                return self.__version
+            self.__async_waiters.append((loop, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self.__condition:
+                if (loop, future) in self.__async_waiters:
+                    self.__async_waiters.remove((loop, future))
+            return self.__version
+
+
+def _resolve(future, version):
+    if not future.done():
+        future.set_result(version)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Trial history with the recent trials in RAM and older ones spilled to disk"""
+
+import tempfile
+
+import numpy as np
+
+
+class TrialStore:
+    """Append-only store of equally shaped trials (e.g. EMG windows) with flat RAM use.
+
+    The newest trials live in a contiguous in-memory array of 2 * ram_trials
+    rows. When it fills up, all but the newest ram_trials rows are appended,
+    in one write, to an anonymous temporary file and read back through a
+    memory map. RAM use is bounded by 2 * ram_trials trials however long
+    the session, and reading a range touches only the pages it needs. As
+    with GrowableArray, rows published through `recent` are never written
+    again.
+    """
+
+    def __init__(self, ram_trials: int = 200, directory=None, dtype=np.float32):
+        """Initializes an empty store.
+
+        Args:
+            ram_trials: Minimum number of newest trials kept in memory
+            directory: Folder of the spill file (system temp folder if None)
+            dtype: Element type
+        """
+        if ram_trials <= 0:
+            raise ValueError("ram_trials must be positive")
+        self.ram_trials = int(ram_trials)
+        self.__directory = directory
+        self.__dtype = np.dtype(dtype)
+
+        self.__ram = None      # (2 * ram_trials, *row_shape), rows [spilled, size) at its start
+        self.__size = 0
+        self.__spilled = 0     # Trials [0, spilled) are on disk
+        self.__file = None
+        self.__disk = None     # Cached read-only memmap of the spilled trials
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def row_shape(self):
+        """Shape of a single trial (None while empty)."""
+        return None if self.__ram is None else self.__ram.shape[1:]
+
+    @property
+    def spilled(self) -> int:
+        """Number of oldest trials stored only on disk."""
+        return self.__spilled
+
+    @property
+    def recent(self) -> np.ndarray:
+        """View of the trials held in memory, the newest last."""
+        if self.__ram is None:
+            return np.empty(0, dtype=self.__dtype)
+        return self.__ram[:self.__size - self.__spilled]
+
+    def append(self, rows):
+        """Appends trials shaped (n, *row_shape)."""
+        rows = np.asarray(rows, dtype=self.__dtype)
+        n = len(rows)
+
+        if self.__ram is None:
+            self.__ram = np.empty((2 * self.ram_trials,) + rows.shape[1:], dtype=self.__dtype)
+        elif rows.shape[1:] != self.__ram.shape[1:]:
+            raise ValueError(f"Row shape {rows.shape[1:]} does not match {self.__ram.shape[1:]}")
+
+        in_ram = self.__size - self.__spilled
+        if in_ram + n > len(self.__ram):
+            # Spill the oldest rows so exactly ram_trials remain in memory afterwards
+            to_spill = in_ram + n - self.ram_trials
+            from_ram = min(to_spill, in_ram)
+            self.__spill(self.__ram[:from_ram])
+            self.__spill(rows[:to_spill - from_ram])
+            # Kept rows move to a new buffer: views already handed out are never overwritten
+            kept = np.empty_like(self.__ram)
+            kept[:in_ram - from_ram] = self.__ram[from_ram:in_ram]
+            self.__ram = kept
+            rows = rows[to_spill - from_ram:]
+            in_ram -= from_ram
+
+        self.__ram[in_ram:in_ram + len(rows)] = rows
+        self.__size += n
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        """Returns trials [start, stop).
+
+        A range entirely in memory or entirely on disk is returned as a view
+        (no copy); a range crossing the boundary is copied.
+        """
+        start = max(0, start)
+        stop = min(stop, self.__size)
+        if stop <= start:
+            return np.empty((0,) + (self.row_shape or ()), dtype=self.__dtype)
+
+        if start >= self.__spilled:
+            return self.__ram[start - self.__spilled:stop - self.__spilled]
+        disk = self.__disk_view()
+        if stop <= self.__spilled:
+            return disk[start:stop]
+        return np.concatenate([disk[start:], self.__ram[:stop - self.__spilled]])
+
+    def iter_chunks(self, chunk_size: int = 256):
+        """Yields consecutive blocks of at most chunk_size trials, oldest first."""
+        for start in range(0, self.__size, chunk_size):
+            yield self.read(start, start + chunk_size)
+
+    def clear(self):
+        """Drops all trials (and the row shape) and deletes the spill file."""
+        self.__disk = None
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        self.__ram = None
+        self.__size = 0
+        self.__spilled = 0
+
+    def __spill(self, rows):
+        if len(rows) == 0:
+            return
+        if self.__file is None:
+            # Anonymous file, removed by the OS when closed
+            self.__file = tempfile.TemporaryFile(dir=self.__directory)
+        self.__file.seek(0, 2)
+        self.__file.write(np.ascontiguousarray(rows).tobytes())
+        self.__file.flush()
+        self.__spilled += len(rows)
+        self.__disk = None
+
+    def __disk_view(self):
+        if self.__disk is None:
+            self.__disk = np.memmap(self.__file, dtype=self.__dtype, mode='r',
+                                    shape=(self.__spilled,) + self.__ram.shape[1:])
+        return self.__disk
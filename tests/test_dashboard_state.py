@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""MEP history processing of DashboardState"""
+
+import numpy as np
+import pytest
+
+from tms_dashboard.core.dashboard_state import DashboardState
+from tms_dashboard.core.modules.emg_connection import TriggeredWindows
+
+FS = 5000
+T_MIN, T_MAX = -0.005, 0.040  # Seconds, as neuroOne.t_min / t_max
+
+
+def sample_at(time_ms):
+    return int(round((time_ms - T_MIN * 1000) * FS / 1000))
+
+
+def make_batch(windows):
+    windows = np.asarray(windows, dtype=np.float32)
+    n = len(windows)
+    return TriggeredWindows(trial_ids=np.arange(n), sample_indexes=np.arange(n) * 10000 + 1000,
+                            trigger_codes=np.ones(n, dtype=np.uint8), windows=windows, cursor=n)
+
+
+def empty_windows(trials=1, channels=1):
+    return np.zeros((trials, channels, sample_at(T_MAX * 1000)), dtype=np.float32)
+
+
+@pytest.fixture
+def dashboard():
+    state = DashboardState()
+    state.mep_quality_action = None
+    return state
+
+
+def test_p2p_matches_metrics_amplitude(dashboard):
+    windows = empty_windows()
+    windows[0, 0, sample_at(6)] = 300           # Stimulus artifact, before the 10 ms search start
+    windows[0, 0, sample_at(22)] = 25           # MEP
+    windows[0, 0, sample_at(24)] = -25
+    dashboard.update_mep_history(make_batch(windows), T_MIN, T_MAX, FS)
+
+    assert dashboard.mep_p2p_history_baseline[0, 0] == pytest.approx(50)
+    assert dashboard.mep_metrics[0, 0]['amplitude'] == pytest.approx(dashboard.mep_p2p_history_baseline[0, 0])
+
+
+def test_set_mep_baseline_removes_offset_exactly(dashboard):
+    windows = empty_windows()
+    windows[0, 0, :] = 7
+    windows[0, 0, sample_at(2):sample_at(8)] = 100  # DC offset filling the configured interval
+    dashboard.update_mep_history(make_batch(windows), T_MIN, T_MAX, FS)
+    dashboard.set_mep_baseline(2, 8)
+
+    corrected = dashboard.read_mep_windows(0, 1)[0, 0]
+    assert np.allclose(corrected[sample_at(2):sample_at(8)], 0)
+    assert np.allclose(corrected[:sample_at(2)], -93)
+
+
+def test_export_writes_one_amplitude_column(dashboard, tmp_path):
+    windows = empty_windows(channels=2)
+    windows[0, 1, sample_at(20)] = 40
+    dashboard.update_mep_history(make_batch(windows), T_MIN, T_MAX, FS)
+    path = tmp_path / "metrics.csv"
+    dashboard.export_mep_metrics(path, channels=[33, 34])
+
+    header, *rows = path.read_text().splitlines()
+    assert header.split(',').count('amplitude') == 1 and 'p2p_uv' not in header
+    amplitudes = [float(row.split(',')[header.split(',').index('amplitude')]) for row in rows]
+    assert amplitudes == pytest.approx(dashboard.mep_p2p_history_baseline[0].tolist())
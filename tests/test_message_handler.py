@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Session lifecycle of MessageHandler"""
+
+import pytest
+
+pytest.importorskip("socketio")
+
+from src.tms_dashboard.core.dashboard_state import DashboardState
+from src.tms_dashboard.core.message_handler import MessageHandler, DISPLACEMENT_TOPIC
+
+
+class FakeSocketClient:
+    """Hands the queued messages to the handler in one batch."""
+
+    def __init__(self):
+        self.messages = []
+
+    def get_buffer(self, timeout=None):
+        messages, self.messages = self.messages, []
+        return messages
+
+
+@pytest.fixture
+def handler():
+    return MessageHandler(FakeSocketClient(), DashboardState(), robot_state=None, message_emit=None)
+
+
+def test_stale_displacement_during_drain_keeps_state_reset(handler):
+    dashboard = handler.dashboard
+    dashboard.target_set = dashboard.image_fiducials = dashboard.tracker_fiducials = True
+    handler.socket_client.messages = [
+        {'topic': 'Exit', 'data': {}},
+        {'topic': DISPLACEMENT_TOPIC, 'data': {'displacement': [1, 2, 3, 0, 0, 0]}},
+        {'topic': 'Coil at target', 'data': {'state': True}},
+        {'topic': 'Robot to Neuronavigation: Robot connection status', 'data': {'data': 'Connected'}},
+    ]
+    handler.process_messages()
+    handler._exit_drain_seconds = 0
+    handler._drain_deadline = 0
+    handler.process_messages()
+
+    assert handler.neuronaviagator_status
+    assert not (dashboard.target_set or dashboard.image_fiducials or dashboard.tracker_fiducials or dashboard.at_target)
+    assert dashboard.robot_set  # Robot messages are replayed
+    assert handler.drained_messages == 2
+
+
+def test_messages_after_new_session_marker_are_handled(handler):
+    handler.socket_client.messages = [
+        {'topic': 'Exit', 'data': {}},
+        {'topic': 'Coil at target', 'data': {'state': True}},
+        {'topic': 'Project loaded successfully', 'data': {}},
+        {'topic': 'Start navigation', 'data': {}},
+    ]
+    handler.process_messages()
+
+    assert handler.neuronaviagator_status
+    assert handler.dashboard.project_set and handler.dashboard.navigation_button_pressed
+    assert not handler.dashboard.at_target
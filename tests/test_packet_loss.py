@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Handling of samples lost between NeurOne packets"""
+
+import numpy as np
+
+from tms_dashboard.constants import TriggerType
+from tms_dashboard.core.modules.emg_connection import neuroOne
+from tms_dashboard.core.modules.emg_filter import EMGFilterConfig
+from tms_dashboard.core.modules.neurone_frames import pack_measurement_start, pack_samples, pack_trigger
+from tms_dashboard.core.modules.ring_buffer import SampleRingBuffer
+
+FS = 5000
+BUNDLES = 50
+
+
+def test_ring_buffer_rejects_windows_overlapping_a_gap():
+    ring = SampleRingBuffer(1000, 2)
+    ring.write(0, np.ones((100, 2)))
+    ring.write(150, np.ones((100, 2)))  # Samples 100-149 lost
+
+    windows, valid = ring.read_windows([0, 90, 150], 50)
+    assert valid.tolist() == [True, False, True]
+    assert not windows[1].any()
+    assert np.isnan(ring.read(100, 150)).all()
+
+
+def feed_session(lost_packets, filter_config=None):
+    """Feeds 1 s of a 100 uV sine with a trigger every 200 ms, skipping the given SAMPLES packets."""
+    device = neuroOne(num_trial=20, t_min=-5, t_max=40, channels=[1], trigger_type_interest=TriggerType.STIMULUS,
+                      filter_config=filter_config)
+    batches = []
+    device.subscribe(batches.append)
+    frames = [pack_measurement_start(FS, [1])]
+    t = np.arange(FS) / FS
+    raw = np.round(1000 * np.sin(2 * np.pi * 40 * t)).astype(np.int32)[:, None]  # 100 nV/bit
+    for seq_no, first in enumerate(range(0, FS, BUNDLES)):
+        if seq_no not in lost_packets:
+            frames.append(pack_samples(seq_no, first, raw[first:first + BUNDLES]))
+        if first % 1000 == 100:
+            frames.append(pack_trigger([(first, 1)]))
+    device.feed(frames)
+    return [trial for batch in batches for trial in zip(batch.sample_indexes.tolist(), batch.windows)]
+
+
+def test_driver_skips_windows_overlapping_lost_packets():
+    trials = dict(feed_session({22}))  # Samples 1100-1149, inside the window of the trigger at 1100
+    assert 1100 not in trials
+    assert sorted(trials) == [100, 2100, 3100, 4100]
+    assert all(np.isfinite(window).all() for window in trials.values())
+
+
+def test_filter_restarts_after_lost_packets():
+    config = EMGFilterConfig(notch_hz=None, highpass_hz=20, lowpass_hz=None)
+    lossy = dict(feed_session({30}, filter_config=config))  # Samples 1500-1549
+    # A stream starting right after the gap: the filter state must not carry across it
+    restarted = dict(feed_session(set(range(31)), filter_config=config))
+    assert np.allclose(lossy[2100], restarted[2100])